@@ -0,0 +1,219 @@
+'''Steps many games at once for training move selection.
+
+N boards live in one (N, dimension_x, dimension_y) array of color indices and every swap, match,
+clear and drop of a wave is done for all boards together. Each board keeps its own seeded RNG
+and draws from it in the same order as GameManager, so board i plays exactly like
+GameManager(seed=seeds[i]) given the same swaps, score included.
+'''
+from random import Random, randrange
+import numpy as np
+from board_module import EMPTY, get_match_mask
+from cascade_module import CascadeResolver
+from coordinate_module import CoordinateHelper
+from score_module import ScoreHelper, ScoreInfo
+
+# swaps with the neighbor to the right and to the bottom, the same order as MoveFinder.swap_directions
+swap_directions = ((1, 0), (0, 1))
+
+def get_shifted(padded: np.ndarray, offset: tuple, shape: tuple) -> np.ndarray:
+    '''Color of the cell at offset from every cell, EMPTY off the board. padded has 2 EMPTY cells around'''
+    x = 2 + offset[0]
+    y = 2 + offset[1]
+    return padded[..., x:x + shape[-2], y:y + shape[-1]]
+
+def get_move_mask(cells: np.ndarray) -> np.ndarray:
+    '''Valid swaps of a stack of match free boards as a (..., 2, dimension_x, dimension_y) mask.
+    [..., d, x, y] is the swap of (x, y) with its neighbor in swap_directions[d]'''
+    shape = cells.shape
+    pad = [(0, 0)] * (cells.ndim - 2) + [(2, 2), (2, 2)]
+    padded = np.pad(cells, pad, constant_values=EMPTY)
+    # runs[s][x, y]: the color from the cell at offset s moved onto (x, y) completes a run
+    runs = {}
+    for source in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        color = get_shifted(padded, source, shape)
+        result = np.zeros(shape, dtype=bool)
+        for window in CoordinateHelper.sliding_windows:
+            if source in window:
+                continue
+            found = color != EMPTY
+            for offset in window:
+                if offset != (0, 0):
+                    found = found & (get_shifted(padded, offset, shape) == color)
+            result |= found
+        runs[source] = result
+    mask = np.zeros(shape[:-2] + (2,) + shape[-2:], dtype=bool)
+    for d, (i, j) in enumerate(swap_directions):
+        # the color coming back from the neighbor is checked at the neighbor
+        back = np.zeros(shape, dtype=bool)
+        back[..., :shape[-2] - i, :shape[-1] - j] = runs[(-i, -j)][..., i:, j:]
+        different = get_shifted(padded, (i, j), shape) != cells
+        mask[..., d, :, :] = (runs[(i, j)] | back) & different & (get_shifted(padded, (i, j), shape) != EMPTY)
+    return mask
+
+class BatchEngine:
+    '''N games stepped together. cells is the (N, dimension_x, dimension_y) int8 board stack,
+    the ScoreInfo fields are arrays with one entry per board'''
+    score_fields = ('total_score', 'turn_score', 'turn_combo', 'turn_matched_count', 'max_combo', 'max_matched_count')
+
+    def __init__(self,
+            count: int,
+            dimension_x: int,
+            dimension_y: int,
+            color_count: int,
+            seeds: list = None,
+            cells: np.ndarray = None) -> None:
+        '''cells is an optional int8 array to keep the boards in, e.g. one on shared memory.
+        Boards are only ever changed in place, so views of it stay current'''
+        self.count = count
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+        # board generation and reshuffles go through the same code as a single game
+        self.resolver = CascadeResolver(dimension_x, dimension_y, color_count)
+        self.score_helper = ScoreHelper()
+        self.score_weights = np.ones(1)
+        if cells is None:
+            cells = np.full((count, dimension_x, dimension_y), EMPTY, dtype=np.int8)
+        self.cells = cells
+        self.total_score = np.zeros(count)
+        self.turn_score = np.zeros(count)
+        self.turn_combo = np.zeros(count, dtype=np.int64)
+        self.turn_matched_count = np.zeros(count, dtype=np.int64)
+        self.max_combo = np.zeros(count, dtype=np.int64)
+        self.max_matched_count = np.zeros(count, dtype=np.int64)
+        self.reshuffled = np.zeros(count, dtype=bool) # boards reshuffled by the last step
+        self.seeds = [None] * count
+        self.rngs = [None] * count
+        self.reset(seeds)
+
+    def reset(self, seeds: list = None, indices: list = None) -> None:
+        '''New boards and scores for the given boards (all by default), each generated like GameManager(seed=...)'''
+        if indices is None:
+            indices = range(self.count)
+        move_finder = self.resolver.move_finder
+        for j, i in enumerate(indices):
+            seed = seeds[j] if seeds is not None else randrange(2 ** 63)
+            rng = Random(seed)
+            cells = self.resolver.board_generator.generate(rng)
+            if not move_finder.has_valid_move(cells):
+                self.resolver.reshuffle(cells, rng)
+            self.cells[i] = np.array(cells, dtype=np.int8).reshape(self.dimension_x, self.dimension_y)
+            self.seeds[i] = seed
+            self.rngs[i] = rng
+            for field in self.score_fields:
+                getattr(self, field)[i] = 0
+
+    def get_score_info(self, index: int) -> ScoreInfo:
+        score_info = ScoreInfo()
+        for field in self.score_fields:
+            setattr(score_info, field, getattr(self, field)[index].item())
+        return score_info
+
+    def get_move_mask(self) -> np.ndarray:
+        return get_move_mask(self.cells)
+
+    def get_score_weights(self, counts: np.ndarray) -> np.ndarray:
+        '''ScoreHelper.get_score_weight of every count, from a table grown on demand'''
+        largest = int(counts.max())
+        if largest >= len(self.score_weights):
+            self.score_weights = np.array(
+                [self.score_helper.get_score_weight(count) for count in range(largest * 2 + 1)], dtype=float)
+        return self.score_weights[counts]
+
+    def step(self, coords_1, coords_2) -> tuple:
+        '''Swaps coords_1[i] with coords_2[i] on board i, (N, 2) arrays of (x, y), and resolves every cascade.
+        Returns (reward, accepted): the score each board gained and whether its swap matched.
+        A rejected swap leaves its board and score as they were'''
+        coords_1 = np.asarray(coords_1, dtype=np.intp).reshape(self.count, 2)
+        coords_2 = np.asarray(coords_2, dtype=np.intp).reshape(self.count, 2)
+        x1, y1 = coords_1[:, 0], coords_1[:, 1]
+        x2, y2 = coords_2[:, 0], coords_2[:, 1]
+        # only orthogonal neighbors on the board, like CascadeResolver.is_swappable
+        valid = (np.abs(x1 - x2) + np.abs(y1 - y2) == 1)
+        for x, y in ((x1, y1), (x2, y2)):
+            valid &= (x >= 0) & (x < self.dimension_x) & (y >= 0) & (y < self.dimension_y)
+        boards = np.flatnonzero(valid)
+        x1, y1, x2, y2 = x1[boards], y1[boards], x2[boards], y2[boards]
+        cells = self.cells
+        colors_1 = cells[boards, x1, y1]
+        cells[boards, x1, y1] = cells[boards, x2, y2]
+        cells[boards, x2, y2] = colors_1
+
+        # boards are match free between turns, so a full scan only finds runs the swap made
+        mask = get_match_mask(cells[boards])
+        matched = mask.any(axis=(1, 2))
+        rejected = ~matched
+        cells[boards[rejected], x2[rejected], y2[rejected]] = cells[boards[rejected], x1[rejected], y1[rejected]]
+        cells[boards[rejected], x1[rejected], y1[rejected]] = colors_1[rejected]
+
+        accepted = np.zeros(self.count, dtype=bool)
+        accepted[boards[matched]] = True
+        reward = np.zeros(self.count)
+        self.reshuffled[:] = False
+        active = boards[matched]
+        if active.size == 0:
+            return reward, accepted
+        self.resolve_cascades(active, mask[matched], reward)
+        self.reshuffle_dead_boards(active)
+        return reward, accepted
+
+    def resolve_cascades(self, active: np.ndarray, mask: np.ndarray, reward: np.ndarray) -> None:
+        '''Clears, drops and spawns on the active boards wave by wave until none of them has a match'''
+        boards = self.cells[active]
+        first_wave = True
+        while active.size > 0:
+            matched_counts = mask.sum(axis=(1, 2))
+            self.add_scores(active, matched_counts, first_wave)
+            reward[active] += self.turn_score[active]
+            boards[mask] = EMPTY
+            self.drop_and_spawn(boards, active)
+            mask = get_match_mask(boards)
+            going_on = mask.any(axis=(1, 2))
+            if not going_on.all():
+                self.cells[active[~going_on]] = boards[~going_on]
+                active = active[going_on]
+                boards = boards[going_on]
+                mask = mask[going_on]
+            first_wave = False
+
+    def add_scores(self, active: np.ndarray, matched_counts: np.ndarray, first_wave: bool) -> None:
+        '''ScoreHelper.add_score(matched_count, 1, first_wave) on every active board'''
+        if first_wave:
+            self.turn_combo[active] = 1
+            self.turn_matched_count[active] = matched_counts
+        else:
+            self.turn_combo[active] += 1
+            self.turn_matched_count[active] += matched_counts
+        self.max_combo[active] = np.maximum(self.max_combo[active], self.turn_combo[active])
+        self.max_matched_count[active] = np.maximum(self.max_matched_count[active], self.turn_matched_count[active])
+        count_weights = self.get_score_weights(self.turn_matched_count[active])
+        combo_weights = self.get_score_weights(self.turn_combo[active])
+        # same operation order as ScoreHelper so the floats come out identical
+        self.turn_score[active] = 100 * matched_counts * count_weights * combo_weights
+        self.total_score[active] += self.turn_score[active]
+
+    def drop_and_spawn(self, boards: np.ndarray, active: np.ndarray) -> None:
+        '''Drops the remaining colors of every column to the bottom in order and fills the top
+        with colors drawn the way GameManager.process_new_block_create draws them'''
+        empty = boards == EMPTY
+        # a stable sort puts the empty cells on top and keeps the order of the rest
+        order = np.argsort(~empty, axis=2, kind='stable')
+        boards[:] = np.take_along_axis(boards, order, axis=2)
+        cleared_counts = empty.sum(axis=2)
+        top = self.color_count - 1
+        colors = []
+        # board by board, columns left to right, the first color drawn lands right above the kept ones
+        for i, x in zip(*np.nonzero(cleared_counts)):
+            rng = self.rngs[active[i]]
+            column_colors = [rng.randint(0, top) for _ in range(cleared_counts[i, x])]
+            column_colors.reverse()
+            colors.extend(column_colors)
+        boards[boards == EMPTY] = colors
+
+    def reshuffle_dead_boards(self, active: np.ndarray) -> None:
+        dead = active[~get_move_mask(self.cells[active]).any(axis=(1, 2, 3))]
+        for i in dead:
+            cells = self.cells[i].ravel().tolist()
+            self.resolver.reshuffle(cells, self.rngs[i])
+            self.cells[i] = np.array(cells, dtype=np.int8).reshape(self.dimension_x, self.dimension_y)
+            self.reshuffled[i] = True
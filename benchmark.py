@@ -0,0 +1,223 @@
+'''Seeded benchmarks for board generation, matching and cascades.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json
+'''
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+from batch_module import BatchEngine, swap_directions
+from bitboard_module import BitBoard, BitBoardResolver
+from cascade_module import CascadeResolver
+from game_manager import GameManager
+from score_module import ScoreHelper
+from simulation_module import HeadlessGame
+from snapshot_module import get_snapshot_size, restore_snapshot, write_snapshot
+
+def make_game_manager(size: int, use_array_board: bool = False, use_bitboard: bool = False) -> GameManager:
+    return GameManager(
+        verbose=False,
+        use_array_board=use_array_board,
+        dimension_x=size,
+        dimension_y=size,
+        use_bitboard=use_bitboard)
+
+def time_operation(operation, repeat: int) -> dict:
+    '''Runs operation repeat times and returns per call statistics in microseconds'''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'min_us': timings[0],
+        'median_us': timings[len(timings) // 2],
+        'mean_us': sum(timings) / len(timings),
+    }
+
+def bench_board_generation(size: int, repeat: int) -> dict:
+    gm = make_game_manager(size)
+    return time_operation(gm.init_cell_map, repeat)
+
+def bench_has_match(size: int, repeat: int) -> dict:
+    gm = make_game_manager(size)
+    sprites = [sprite for column in gm.sprite_map for sprite in column]
+    return time_operation(lambda: gm.has_match(random.choice(sprites)), repeat)
+
+def bench_full_scan(size: int, repeat: int) -> dict:
+    gm = make_game_manager(size)
+    def scan() -> None:
+        for column in gm.sprite_map:
+            for sprite in column:
+                gm.get_matched_coordinates(sprite)
+    return time_operation(scan, repeat)
+
+def bench_full_scan_array(size: int, repeat: int) -> dict:
+    gm = make_game_manager(size, use_array_board=True)
+    return time_operation(gm.color_board.get_matched_coordinates, repeat)
+
+def bench_full_scan_bitboard(size: int, repeat: int) -> dict:
+    gm = make_game_manager(size, use_bitboard=True)
+    return time_operation(gm.color_board.get_matched_coordinates, repeat)
+
+def bench_cascade(size: int, repeat: int, use_array_board: bool = False) -> dict:
+    '''One hinted swap through clear, drop, spawn and re-match until the turn ends'''
+    game = HeadlessGame(make_game_manager(size, use_array_board=use_array_board))
+    def play() -> None:
+        move = game.game_manager.get_hint()
+        game.play_turn(move[0], move[1])
+    return time_operation(play, repeat)
+
+def bench_cascade_array(size: int, repeat: int) -> dict:
+    return bench_cascade(size, repeat, use_array_board=True)
+
+def bench_resolve_swap(size: int, repeat: int) -> dict:
+    '''The same hinted swap cascade resolved in one call without animation states'''
+    gm = make_game_manager(size)
+    resolver = CascadeResolver(size, size, len(gm.color_keys))
+    cells = gm.get_color_cells()
+    move = gm.get_hint()
+    rng = random.Random(0)
+    return time_operation(lambda: resolver.resolve(cells, move[0], move[1], rng), repeat)
+
+def bench_resolve_swap_bitboard(size: int, repeat: int) -> dict:
+    '''bench_resolve_swap with the board kept as a BitBoard'''
+    gm = make_game_manager(size)
+    resolver = BitBoardResolver(size, size, len(gm.color_keys))
+    board = BitBoard.from_cells(size, size, len(gm.color_keys), gm.get_color_cells())
+    move = gm.get_hint()
+    rng = random.Random(0)
+    return time_operation(lambda: resolver.resolve_board(board, move[0], move[1], rng), repeat)
+
+def bench_batch_step(size: int, repeat: int) -> dict:
+    '''One turn on each of batch_count boards stepped together, the first valid swap of every board'''
+    batch_count = 256
+    engine = BatchEngine(batch_count, size, size, len(GameManager.color_keys),
+        seeds=[random.randrange(2 ** 63) for _ in range(batch_count)])
+    directions = np.array(swap_directions)
+    def step() -> None:
+        moves = engine.get_move_mask().reshape(batch_count, -1).argmax(axis=1)
+        direction, cell = np.divmod(moves, size * size)
+        coords = np.stack(np.divmod(cell, size), axis=1)
+        engine.step(coords, coords + directions[direction])
+    return time_operation(step, repeat)
+
+def bench_add_score(size: int, repeat: int) -> dict:
+    score_helper = ScoreHelper()
+    return time_operation(lambda: score_helper.add_score(random.randint(3, size), 1, False), repeat)
+
+def bench_snapshot(size: int, repeat: int) -> dict:
+    '''Checkpoint of a game into a reused buffer and restore of it into another game'''
+    gm = make_game_manager(size)
+    other = make_game_manager(size)
+    buffer = bytearray(get_snapshot_size(size, size))
+    def round_trip() -> None:
+        write_snapshot(gm, buffer)
+        restore_snapshot(other, buffer)
+    return time_operation(round_trip, repeat)
+
+def measure_session_memory(size: int, count: int) -> dict:
+    '''Memory held per live GameManager, measured over count sessions kept alive at once'''
+    make_game_manager(size) # shared per size tables are not part of a session
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    sessions = [make_game_manager(size) for _ in range(count)]
+    total = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del sessions
+    return {'sessions': count, 'bytes_per_session': total / count}
+
+benchmarks = {
+    'board_generation': bench_board_generation,
+    'has_match': bench_has_match,
+    'full_scan': bench_full_scan,
+    'full_scan_array': bench_full_scan_array,
+    'full_scan_bitboard': bench_full_scan_bitboard,
+    'cascade': bench_cascade,
+    'cascade_array': bench_cascade_array,
+    'resolve_swap': bench_resolve_swap,
+    'resolve_swap_bitboard': bench_resolve_swap_bitboard,
+    'batch_step': bench_batch_step,
+    'add_score': bench_add_score,
+    'snapshot': bench_snapshot,
+}
+
+def run_benchmarks(sizes: list, repeat: int, seed: int, names: list = None, memory_sessions: int = 0) -> dict:
+    results = {}
+    for name, benchmark in benchmarks.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            # every case starts from the same seed so runs are comparable
+            random.seed(seed)
+            results[f'{name}@{size}'] = benchmark(size, repeat)
+    memory = {}
+    if memory_sessions > 0:
+        for size in sizes:
+            random.seed(seed)
+            memory[f'session@{size}'] = measure_session_memory(size, memory_sessions)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'sizes': sizes,
+            'repeat': repeat,
+        },
+        'results': results,
+        'memory': memory,
+    }
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> list:
+    '''Prints the median ratio of every case found in both runs and returns the regressed case names'''
+    regressions = []
+    for key, result in current['results'].items():
+        if key not in baseline['results']:
+            continue
+        ratio = result['median_us'] / baseline['results'][key]['median_us']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  SLOWER'
+            regressions.append(key)
+        elif ratio < 1 - tolerance:
+            flag = '  faster'
+        print(f'{key:28} {baseline["results"][key]["median_us"]:12.1f}us -> {result["median_us"]:12.1f}us  x{ratio:.2f}{flag}')
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Match-3 engine benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=list(benchmarks.keys()))
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--memory', type=int, default=0, metavar='SESSIONS', help='also measure the memory per game over this many live sessions')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed median slowdown before a case counts as regressed')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat, args.seed, args.only, args.memory)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        for key, result in results['memory'].items():
+            print(f'{key:28} {result["bytes_per_session"]:12.0f} bytes')
+        return 1 if regressions else 0
+    if not args.output:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
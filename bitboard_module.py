@@ -0,0 +1,299 @@
+from cascade_module import CascadeResolver, CascadeResult, CascadeWave
+from coordinate_module import CoordinateHelper
+from score_module import ScoreHelper
+
+EMPTY = -1 # color index of a cleared cell, same as board_module
+
+class BitBoard:
+    '''Board colors as one int bitmask per color index.
+    Cell (x, y) is bit x * stride + y with stride = dimension_y + 1. The spare bit after every column
+    stays 0, so vertical runs never wrap into the next column. Matching, clearing and gravity are
+    shifts and ANDs over the whole board, and a copy is just a list of ints'''
+    layouts = {} # (board_mask, bit_tables, move_patterns) per board shape, shared by every copy
+    byte_table = bytes.maketrans(b'01', b'\x00\x01')
+
+    def __init__(self, dimension_x: int, dimension_y: int, color_count: int, masks: list = None) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+        self.stride = dimension_y + 1
+        key = (dimension_x, dimension_y, color_count)
+        if key not in self.layouts:
+            self.layouts[key] = (
+                # every bit that is a cell, the spare bits excluded
+                int(('0' + '1' * dimension_y) * dimension_x, 2),
+                # bytes.translate tables that turn color index + 1 into the bit string of one color
+                [bytes(b'01'[i == color + 1] for i in range(256)) for color in range(color_count)],
+                self.build_move_patterns(),
+            )
+        self.board_mask, self.bit_tables, self.move_patterns = self.layouts[key]
+        if masks is None:
+            masks = [0] * color_count
+        self.masks = masks
+
+    @classmethod
+    def from_cells(cls, dimension_x: int, dimension_y: int, color_count: int, cells: list) -> 'BitBoard':
+        '''cells are color indices flattened column by column like MoveFinder uses'''
+        board = cls(dimension_x, dimension_y, color_count)
+        board.set_cells(cells)
+        return board
+
+    @classmethod
+    def from_sprite_map(cls, sprite_map: list, color_keys: list) -> 'BitBoard':
+        color_index = {color: i for i, color in enumerate(color_keys)}
+        cells = [color_index[sprite.color] for column in sprite_map for sprite in column]
+        return cls.from_cells(len(sprite_map), len(sprite_map[0]), len(color_keys), cells)
+
+    def get_region_mask(self, x_start: int, x_end: int, y_start: int, y_end: int) -> int:
+        '''Bits of the cells with x_start <= x < x_end and y_start <= y < y_end'''
+        x_start, y_start = max(x_start, 0), max(y_start, 0)
+        x_end, y_end = min(x_end, self.dimension_x), min(y_end, self.dimension_y)
+        if x_start >= x_end or y_start >= y_end:
+            return 0
+        column = ((1 << (y_end - y_start)) - 1) << y_start
+        return int(format(column, f'0{self.stride}b') * (x_end - x_start), 2) << (x_start * self.stride)
+
+    def build_move_patterns(self) -> list:
+        '''(target cells, bit offsets) for every way a block moving onto a target completes a window:
+        the two other cells of the window and the neighbor the block comes from'''
+        neighbors = ((1, 0), (-1, 0), (0, 1), (0, -1))
+        patterns = set()
+        for window in CoordinateHelper.sliding_windows:
+            others = [offset for offset in window if offset != (0, 0)]
+            for neighbor in neighbors:
+                if neighbor not in window:
+                    patterns.add(tuple(sorted(others + [neighbor])))
+        results = []
+        for offsets in sorted(patterns):
+            xs = [0] + [offset[0] for offset in offsets]
+            ys = [0] + [offset[1] for offset in offsets]
+            # targets whose pattern stays on the board, so no shift wraps around a border
+            targets = self.get_region_mask(
+                -min(xs), self.dimension_x - max(xs), -min(ys), self.dimension_y - max(ys))
+            if targets:
+                results.append((targets, tuple(x * self.stride + y for x, y in offsets)))
+        return results
+
+    def copy(self) -> 'BitBoard':
+        return BitBoard(self.dimension_x, self.dimension_y, self.color_count, list(self.masks))
+
+    def get_bit(self, x: int, y: int) -> int:
+        return x * self.stride + y
+
+    def get_mask(self, coordinates) -> int:
+        mask = 0
+        for x, y in coordinates:
+            mask |= 1 << (x * self.stride + y)
+        return mask
+
+    def set_cells(self, cells: list) -> None:
+        '''Rebuilds every mask from flat color indices, one bit string per color'''
+        dimension_y = self.dimension_y
+        # one character per bit, most significant first, a spare '\0' closes every column
+        text = bytearray()
+        for x in reversed(range(self.dimension_x)):
+            text.append(0)
+            text.extend(color + 1 for color in reversed(cells[x * dimension_y:(x + 1) * dimension_y]))
+        self.masks = [int(text.translate(table), 2) for table in self.bit_tables]
+
+    def to_cells(self) -> list:
+        '''Flat color indices, EMPTY for cleared cells'''
+        # spread every bit to a byte, the masks do not overlap so the byte of a cell ends up as color + 1
+        total = 0
+        for color, mask in enumerate(self.masks):
+            bits = bin(mask)[:1:-1].encode().translate(self.byte_table)
+            total += (color + 1) * int.from_bytes(bits, 'little')
+        stride = self.stride
+        data = total.to_bytes(self.dimension_x * stride, 'little')
+        return [value - 1 for x in range(self.dimension_x) for value in data[x * stride:x * stride + self.dimension_y]]
+
+    def iter_bits(self, mask: int):
+        '''Set bits of mask from the lowest up'''
+        bits = bin(mask)[:1:-1]
+        bit = bits.find('1')
+        while bit >= 0:
+            yield bit
+            bit = bits.find('1', bit + 1)
+
+    def get_coordinates(self, mask: int) -> list:
+        '''Cells of mask as (x, y), sorted'''
+        return [divmod(bit, self.stride) for bit in self.iter_bits(mask)]
+
+    def get_color(self, x: int, y: int) -> int:
+        bit = 1 << (x * self.stride + y)
+        for color, mask in enumerate(self.masks):
+            if mask & bit:
+                return color
+        return EMPTY
+
+    def set_color(self, x: int, y: int, color: int) -> None:
+        bit = 1 << (x * self.stride + y)
+        masks = self.masks
+        for i in range(self.color_count):
+            masks[i] &= ~bit
+        if color != EMPTY:
+            masks[color] |= bit
+
+    def set_column(self, x: int, colors: list) -> None:
+        '''Sets the top len(colors) rows of column x'''
+        shift = x * self.stride
+        column_bits = ((1 << len(colors)) - 1) << shift
+        column_masks = [0] * self.color_count
+        for y, color in enumerate(colors):
+            if color != EMPTY:
+                column_masks[color] |= 1 << y
+        masks = self.masks
+        for i in range(self.color_count):
+            masks[i] = (masks[i] & ~column_bits) | (column_masks[i] << shift)
+
+    def swap(self, coord1: tuple, coord2: tuple) -> None:
+        color_1 = self.get_color(coord1[0], coord1[1])
+        color_2 = self.get_color(coord2[0], coord2[1])
+        self.set_color(coord1[0], coord1[1], color_2)
+        self.set_color(coord2[0], coord2[1], color_1)
+
+    def clear(self, coordinates) -> None:
+        self.clear_mask(self.get_mask(coordinates))
+
+    def clear_mask(self, mask: int) -> None:
+        keep = ~mask
+        self.masks = [m & keep for m in self.masks]
+
+    def clear_dirty(self) -> None:
+        '''Nothing to track, matching always covers the whole board'''
+        return
+
+    def get_occupied_mask(self) -> int:
+        occupied = 0
+        for mask in self.masks:
+            occupied |= mask
+        return occupied
+
+    def get_match_mask(self) -> int:
+        '''Bits of every cell that belongs to a horizontal or vertical run of 3 or more'''
+        stride = self.stride
+        matched = 0
+        for m in self.masks:
+            # runs along y, starting at each set bit of run
+            run = m & (m >> 1) & (m >> 2)
+            matched |= run | (run << 1) | (run << 2)
+            # runs along x
+            run = m & (m >> stride) & (m >> 2 * stride)
+            matched |= run | (run << stride) | (run << 2 * stride)
+        return matched
+
+    def has_match(self) -> bool:
+        stride = self.stride
+        for m in self.masks:
+            if m & (m >> 1) & (m >> 2) or m & (m >> stride) & (m >> 2 * stride):
+                return True
+        return False
+
+    def has_valid_move(self) -> bool:
+        '''True if a swap of two neighbors makes a run, for a match free board like MoveFinder gets'''
+        for targets, offsets in self.move_patterns:
+            for m in self.masks:
+                hits = targets
+                for offset in offsets:
+                    hits &= m >> offset if offset > 0 else m << -offset
+                    if not hits:
+                        break
+                if hits:
+                    return True
+        return False
+
+    def get_matched_coordinates(self) -> set:
+        return set(self.get_coordinates(self.get_match_mask()))
+
+    def get_dirty_matched_coordinates(self) -> set:
+        '''Same as get_matched_coordinates(), kept so GameManager can use BitBoard like ArrayBoard.
+        On a board that was match free before the last changes every run touches a changed cell'''
+        return self.get_matched_coordinates()
+
+    def drop(self) -> None:
+        '''Moves every block down into the empty cells below it.
+        Each pass moves everything above the lowest hole of every column down by one row'''
+        board_mask = self.board_mask
+        while True:
+            occupied = self.get_occupied_mask()
+            holes = board_mask & ~occupied
+            # cells with a hole anywhere below them in the same column, filled upwards in
+            # doubling steps that stop at the spare bit between columns
+            below = (holes >> 1) & board_mask
+            propagate = board_mask
+            shift = 1
+            while shift < self.dimension_y:
+                below |= (below >> shift) & propagate
+                propagate &= propagate >> shift
+                shift *= 2
+            movers = occupied & below
+            if not movers:
+                return
+            masks = self.masks
+            for i in range(self.color_count):
+                moving = masks[i] & movers
+                if moving:
+                    masks[i] = (masks[i] ^ moving) | (moving << 1)
+
+    def spawn(self, cleared_counts: dict, rng) -> dict:
+        '''Fills the empty rows on top of each column after drop(). Colors are drawn like
+        GameManager.process_new_block_create: columns left to right, the first color drawn
+        lands right above the blocks that stay. Returns the colors per column from the top row down'''
+        spawned_colors = {}
+        masks = self.masks
+        for x in sorted(cleared_counts):
+            count = cleared_counts[x]
+            shift = x * self.stride
+            new_colors = []
+            for i in range(count):
+                color = rng.randint(0, self.color_count - 1)
+                masks[color] |= 1 << (shift + count - 1 - i)
+                new_colors.append(color)
+            new_colors.reverse()
+            spawned_colors[x] = new_colors
+        return spawned_colors
+
+class BitBoardResolver(CascadeResolver):
+    '''CascadeResolver that runs the cascade on a BitBoard. The results are the same for the same
+    RNG state, every wave is matched, cleared and dropped over the whole board at once'''
+    def resolve(self, cells: list, coord1: tuple, coord2: tuple, rng, score_helper: ScoreHelper = None) -> CascadeResult:
+        '''Same as CascadeResolver.resolve, the board goes through a BitBoard and back'''
+        board = BitBoard.from_cells(self.dimension_x, self.dimension_y, self.color_count, cells)
+        result = self.resolve_board(board, coord1, coord2, rng, score_helper)
+        result.cells = result.cells.to_cells() if result.accepted else list(cells)
+        return result
+
+    def resolve_board(self, board: BitBoard, coord1: tuple, coord2: tuple, rng, score_helper: ScoreHelper = None) -> CascadeResult:
+        '''resolve() without leaving the bitboard, for searches that keep many boards around.
+        board is not modified, result.cells is a new BitBoard'''
+        if score_helper is None:
+            score_helper = ScoreHelper()
+        if not self.is_swappable(coord1, coord2):
+            return CascadeResult(board, False, [], score_helper.get_score_info(), False)
+
+        board = board.copy()
+        board.swap(coord1, coord2)
+        matched = board.get_match_mask()
+        if not matched:
+            board.swap(coord1, coord2)
+            return CascadeResult(board, False, [], score_helper.get_score_info(), False)
+
+        waves = []
+        while matched:
+            score_helper.add_score(matched.bit_count(), 1, len(waves) == 0)
+            cleared_coords = board.get_coordinates(matched)
+            cleared_counts = {}
+            for x, _ in cleared_coords:
+                cleared_counts[x] = cleared_counts.get(x, 0) + 1
+            board.clear_mask(matched)
+            board.drop()
+            waves.append(CascadeWave(cleared_coords, board.spawn(cleared_counts, rng)))
+            matched = board.get_match_mask()
+
+        reshuffled = False
+        if not board.has_valid_move():
+            cells = board.to_cells()
+            self.reshuffle(cells, rng)
+            board.set_cells(cells)
+            reshuffled = True
+        return CascadeResult(board, True, waves, score_helper.get_score_info(), reshuffled)
@@ -0,0 +1,139 @@
+import numpy as np
+from coordinate_module import CoordinateHelper
+
+EMPTY = -1 # color index of a cleared cell, never matches anything
+
+def get_match_mask(cells: np.ndarray) -> np.ndarray:
+    '''Boolean mask of every cell that belongs to a horizontal or vertical run of 3 or more.
+    The last two axes are x and y, so a stack of boards is checked in one go'''
+    c = cells
+    mask = np.zeros(c.shape, dtype=bool)
+    # runs along x, starting at each cell of c[:-2, :]
+    run = (c[..., :-2, :] == c[..., 1:-1, :]) & (c[..., 1:-1, :] == c[..., 2:, :]) & (c[..., :-2, :] != EMPTY)
+    mask[..., :-2, :] |= run
+    mask[..., 1:-1, :] |= run
+    mask[..., 2:, :] |= run
+    # runs along y
+    run = (c[..., :, :-2] == c[..., :, 1:-1]) & (c[..., :, 1:-1] == c[..., :, 2:]) & (c[..., :, :-2] != EMPTY)
+    mask[..., :, :-2] |= run
+    mask[..., :, 1:-1] |= run
+    mask[..., :, 2:] |= run
+    return mask
+
+class ArrayBoard:
+    '''Board colors stored as small-integer color indices in a NumPy array.
+    Cells are indexed [x][y] just like GameManager.sprite_map'''
+    # with more dirty cells than this one NumPy mask over their box beats checking their windows
+    dirty_window_limit = 16
+
+    def __init__(self, dimension_x: int, dimension_y: int, cells: np.ndarray = None) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        if cells is None:
+            cells = np.full((dimension_x, dimension_y), EMPTY, dtype=np.int8)
+        self.cells = cells
+        self.coord_helper = CoordinateHelper(dimension_x, dimension_y)
+        # cells whose color changed since the last clear_dirty(), only windows
+        # touching them can hold a new match
+        self.dirty = set()
+        self.dirty_matches = None # get_dirty_matched_coordinates() until the board changes again
+
+    @classmethod
+    def from_sprite_map(cls, sprite_map: list, color_keys: list) -> 'ArrayBoard':
+        color_index = {color: i for i, color in enumerate(color_keys)}
+        cells = np.array(
+            [[color_index[sprite.color] for sprite in column] for column in sprite_map],
+            dtype=np.int8)
+        return cls(cells.shape[0], cells.shape[1], cells)
+
+    def copy(self) -> 'ArrayBoard':
+        return ArrayBoard(self.dimension_x, self.dimension_y, self.cells.copy())
+
+    def to_cells(self) -> list:
+        '''Flat color indices, column by column like MoveFinder uses'''
+        return self.cells.ravel().tolist()
+
+    def set_cells(self, cells: list) -> None:
+        self.cells[:, :] = np.array(cells, dtype=np.int8).reshape(self.dimension_x, self.dimension_y)
+        self.dirty_matches = None
+
+    def get_color(self, x: int, y: int) -> int:
+        return int(self.cells[x, y])
+
+    def set_color(self, x: int, y: int, color: int) -> None:
+        self.cells[x, y] = color
+        self.dirty_matches = None
+
+    def set_column(self, x: int, colors: list) -> None:
+        '''Sets the top len(colors) rows of column x'''
+        column = self.cells[x]
+        for y, color in enumerate(colors):
+            if column[y] != color:
+                self.dirty.add((x, y))
+        column[:len(colors)] = colors
+        self.dirty_matches = None
+
+    def swap(self, coord1: tuple, coord2: tuple) -> None:
+        x1, y1 = coord1
+        x2, y2 = coord2
+        self.cells[x1, y1], self.cells[x2, y2] = self.cells[x2, y2], self.cells[x1, y1]
+        self.dirty.add((x1, y1))
+        self.dirty.add((x2, y2))
+        self.dirty_matches = None
+
+    def clear(self, coordinates: set) -> None:
+        for x, y in coordinates:
+            self.cells[x, y] = EMPTY
+            self.dirty.add((x, y))
+        self.dirty_matches = None
+
+    def clear_dirty(self) -> None:
+        self.dirty = set()
+        self.dirty_matches = None
+
+    def get_match_mask(self) -> np.ndarray:
+        '''Boolean mask of every cell that belongs to a horizontal or vertical run of 3 or more'''
+        return get_match_mask(self.cells)
+
+    def get_matched_coordinates(self) -> set:
+        return {(int(x), int(y)) for x, y in np.argwhere(self.get_match_mask())}
+
+    def has_match(self) -> bool:
+        return bool(self.get_match_mask().any())
+
+    def get_dirty_matched_coordinates(self) -> set:
+        '''Same result as get_matched_coordinates() on a board that was match free
+        before the dirty cells changed, but only evaluates windows near them.
+        The game asks several times per wave, so the set is kept until the board changes, do not change it'''
+        if self.dirty_matches is None:
+            if len(self.dirty) > self.dirty_window_limit:
+                self.dirty_matches = self.get_box_matched_coordinates()
+            else:
+                self.dirty_matches = self.get_window_matched_coordinates()
+        return self.dirty_matches
+
+    def get_window_matched_coordinates(self) -> set:
+        '''get_dirty_matched_coordinates() checking every window through the dirty cells'''
+        results = set()
+        item = self.cells.item
+        get_sliding_windows_at = self.coord_helper.get_sliding_windows_at
+        for x, y in self.dirty:
+            color = item(x, y)
+            if color == EMPTY:
+                continue
+            for window in get_sliding_windows_at(x, y):
+                (x1, y1), (x2, y2), (x3, y3) = window
+                if item(x1, y1) == color and item(x2, y2) == color and item(x3, y3) == color:
+                    results.update(window)
+        return results
+
+    def get_box_matched_coordinates(self) -> set:
+        '''get_dirty_matched_coordinates() with one mask over the box around the dirty cells'''
+        xs, ys = zip(*self.dirty)
+        # windows reach 2 cells past a dirty cell, every new run lies inside the box
+        x0 = max(0, min(xs) - 2)
+        y0 = max(0, min(ys) - 2)
+        x1 = min(self.dimension_x, max(xs) + 3)
+        y1 = min(self.dimension_y, max(ys) + 3)
+        xs, ys = np.nonzero(get_match_mask(self.cells[x0:x1, y0:y1]))
+        return set(zip((xs + x0).tolist(), (ys + y0).tolist()))
@@ -0,0 +1,102 @@
+from generator_module import BoardGenerator
+from move_module import MoveFinder
+from score_module import ScoreHelper, ScoreInfo
+
+class CascadeWave:
+    '''One clear step of a cascade: the cleared cells and the colors spawned on top of each column'''
+    def __init__(self, cleared_coords: list, spawned_colors: dict) -> None:
+        self.cleared_coords = cleared_coords # sorted (x, y)
+        self.spawned_colors = spawned_colors # x -> color indices from the top row down
+
+class CascadeResult:
+    def __init__(self, cells: list, accepted: bool, waves: list, score_info: ScoreInfo, reshuffled: bool) -> None:
+        self.cells = cells
+        self.accepted = accepted
+        self.waves = waves
+        self.combo = len(waves)
+        self.score_info = score_info
+        self.reshuffled = reshuffled
+
+class CascadeResolver:
+    '''Resolves a swap and every clear, drop and spawn that follows it in one call.
+    Boards are flat color index lists like MoveFinder uses. Given an RNG in the same state,
+    the result is exactly what GameManager reaches when the turn is animated'''
+    max_reshuffle_count = 1000
+
+    def __init__(self, dimension_x: int, dimension_y: int, color_count: int) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+        self.move_finder = MoveFinder.for_size(dimension_x, dimension_y)
+        self.board_generator = BoardGenerator(dimension_x, dimension_y, color_count)
+
+    def is_swappable(self, coord1: tuple, coord2: tuple) -> bool:
+        '''Only orthogonal neighbors on the board can be swapped'''
+        for x, y in (coord1, coord2):
+            if x < 0 or x >= self.dimension_x or y < 0 or y >= self.dimension_y:
+                return False
+        return abs(coord1[0] - coord2[0]) + abs(coord1[1] - coord2[1]) == 1
+
+    def resolve(self, cells: list, coord1: tuple, coord2: tuple, rng, score_helper: ScoreHelper = None) -> CascadeResult:
+        '''cells is not modified. rng is advanced by the spawns and a possible reshuffle,
+        score_helper (a new one by default) gets one add_score per wave'''
+        if score_helper is None:
+            score_helper = ScoreHelper()
+        if not self.is_swappable(coord1, coord2):
+            return CascadeResult(cells, False, [], score_helper.get_score_info(), False)
+
+        cells = list(cells)
+        index_1 = self.move_finder.to_index(coord1[0], coord1[1])
+        index_2 = self.move_finder.to_index(coord2[0], coord2[1])
+        cells[index_1], cells[index_2] = cells[index_2], cells[index_1]
+        matched = self.move_finder.get_matched_indices(cells, (index_1, index_2))
+        if not matched:
+            cells[index_1], cells[index_2] = cells[index_2], cells[index_1]
+            return CascadeResult(cells, False, [], score_helper.get_score_info(), False)
+
+        waves = []
+        while matched:
+            score_helper.add_score(len(matched), 1, len(waves) == 0)
+            spawned_colors, changed = self.clear_and_drop(cells, matched, rng)
+            waves.append(CascadeWave(sorted(self.move_finder.to_coord(i) for i in matched), spawned_colors))
+            matched = self.move_finder.get_matched_indices(cells, changed)
+
+        reshuffled = False
+        if not self.move_finder.has_valid_move(cells):
+            self.reshuffle(cells, rng)
+            reshuffled = True
+        return CascadeResult(cells, True, waves, score_helper.get_score_info(), reshuffled)
+
+    def clear_and_drop(self, cells: list, matched: set, rng) -> tuple:
+        '''Clears the matched cells in place, drops the rest and spawns new colors on top.
+        Returns the spawned colors per column and the cells that were cleared or changed color'''
+        dimension_y = self.dimension_y
+        cleared_by_column = {}
+        for index in matched:
+            cleared_by_column.setdefault(index // dimension_y, set()).add(index % dimension_y)
+        spawned_colors = {}
+        changed = []
+        # same draw order as GameManager.process_new_block_create: columns left to right,
+        # the first color drawn lands right above the blocks that stay
+        for x in sorted(cleared_by_column):
+            cleared_rows = cleared_by_column[x]
+            start = x * dimension_y
+            # rows below the lowest cleared cell keep their colors
+            end = start + max(cleared_rows) + 1
+            old_column = cells[start:end]
+            new_colors = [rng.randint(0, self.color_count - 1) for _ in range(len(cleared_rows))]
+            new_colors.reverse()
+            column = new_colors + [color for y, color in enumerate(old_column) if y not in cleared_rows]
+            cells[start:end] = column
+            spawned_colors[x] = new_colors
+            for y in range(len(column)):
+                if y in cleared_rows or old_column[y] != column[y]:
+                    changed.append(start + y)
+        return spawned_colors, changed
+
+    def reshuffle(self, cells: list, rng) -> None:
+        '''Same steps as GameManager.reshuffle_board, including its fallback to a new board'''
+        while not self.move_finder.reshuffle(cells, rng, self.max_reshuffle_count):
+            cells[:] = self.board_generator.generate(rng)
+            if self.move_finder.has_valid_move(cells):
+                return
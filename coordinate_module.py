@@ -1,4 +1,5 @@
 from enum import Enum
+from types import MappingProxyType
 from sprite_manager import ColorBlockSprite
 from game_object import CellObject
 
@@ -27,9 +28,69 @@ class CoordinateHelper:
         ((0, -1), (0, 0), (0, 1)),
         ((0, 0), (0, 1), (0, 2)),
     )
+    # directions of get_clear_coordinates_dict, each contains 2 offsets
+    clearing_directions = (
+        ('left', ((-1, 0), (-2, 0))),
+        ('right', ((1, 0), (2, 0))),
+        ('down', ((0, -1), (0, -2))),
+        ('up', ((0, 1), (0, 2))),
+    )
+    # boards up to this many cells get their tables when the helper is created,
+    # bigger ones fill a cell the first time it is asked for
+    eager_cell_limit = 4096
+    tables = {} # (dimension_x, dimension_y) -> per cell tables shared by every helper of that size
+
     def __init__(self, dimension_x: int, dimension_y: int) -> None:
         self.dimension_x = dimension_x
         self.dimension_y = dimension_y
+        key = (dimension_x, dimension_y)
+        if key not in self.tables:
+            self.tables[key] = self.create_tables()
+        # indexed by x * dimension_y + y, every entry is immutable
+        self.coords, self.window_table, self.clear_table, self.clear_dict_table = self.tables[key]
+
+    def create_tables(self) -> tuple:
+        cell_count = self.dimension_x * self.dimension_y
+        # one tuple per cell that every table refers to
+        coords = [(x, y) for x in range(self.dimension_x) for y in range(self.dimension_y)]
+        tables = (coords, [None] * cell_count, [None] * cell_count, [None] * cell_count)
+        if cell_count <= self.eager_cell_limit:
+            for index in range(cell_count):
+                self.fill_cell(tables, index)
+        return tables
+
+    def fill_cell(self, tables: tuple, index: int) -> None:
+        coords, window_table, clear_table, clear_dict_table = tables
+        x, y = coords[index]
+        dimension_y = self.dimension_y
+        def get_coords(offsets: tuple) -> tuple:
+            '''Coordinates of the offsets from the cell, None if one is off the board'''
+            cells = []
+            for i, j in offsets:
+                if not self.is_valid_coordinate(x + i, y + j):
+                    return None
+                cells.append(coords[index + i * dimension_y + j])
+            return tuple(cells)
+        window_table[index] = tuple(
+            window for window in map(get_coords, self.sliding_windows) if window is not None)
+        clear_table[index] = tuple(
+            coords[index + i * dimension_y + j]
+            for i, j in self.clearing_offsets if self.is_valid_coordinate(x + i, y + j))
+        clear_dict = {}
+        for key, offsets in self.clearing_directions:
+            dir_coords = get_coords(offsets)
+            if dir_coords is not None:
+                clear_dict[key] = dir_coords
+        # read only, since every helper of the size hands out the same one
+        clear_dict_table[index] = MappingProxyType(clear_dict)
+
+    def get_cell_index(self, cell: ColorBlockSprite) -> int:
+        '''Flat index of a cell on the board, its tables are filled if they were not yet'''
+        index = cell.x * self.dimension_y + cell.y
+        if self.window_table[index] is None:
+            self.fill_cell(self.tables[(self.dimension_x, self.dimension_y)], index)
+        return index
+
     def is_valid_coordinate(self, x: int, y: int) -> bool:
         if x < 0 or x >= self.dimension_x:
             return False
@@ -67,51 +128,27 @@ class CoordinateHelper:
             return False
         return True
 
-    def get_clear_coordinates(self, cell: ColorBlockSprite):
-        result = []
-        for offset in self.clearing_offsets:
-            if self.is_valid_coordinate(cell.x + offset[0], cell.y + offset[1]):
-                result.append((cell.x + offset[0], cell.y + offset[1]))
-        return result
+    def get_clear_coordinates(self, cell: ColorBlockSprite) -> tuple:
+        return self.clear_table[self.get_cell_index(cell)]
 
-    def get_clear_coordinates_dict(self, sprite: ColorBlockSprite) -> dict:
-        result = {}
-        all_offsets =  { # each direction contains 2 tuples of offsets
-            'left': ((-1, 0), (-2, 0)),
-            'right': ((1, 0), (2, 0)),
-            'down': ((0, -1), (0, -2)),
-            'up': ((0, 1), (0, 2)),
-        }
+    def get_clear_coordinates_dict(self, sprite: ColorBlockSprite) -> MappingProxyType:
+        '''Direction -> the 2 coordinates next to the sprite that way, only directions that fit on the board.
+        The mapping is shared and read only'''
+        return self.clear_dict_table[self.get_cell_index(sprite)]
 
-        for key, value in all_offsets.items():
-            is_dir_needed = True
-            dir_coords = []
-            for offset in value:
-                if not self.is_valid_coordinate(sprite.x + offset[0], sprite.y + offset[1]):
-                    is_dir_needed = False
-                    break
-                dir_coords.append((sprite.x + offset[0], sprite.y + offset[1]))
-            if is_dir_needed:
-                result[key] = dir_coords
-        return result
+    def get_sliding_windows(self, sprite: ColorBlockSprite) -> tuple:
+        return self.window_table[self.get_cell_index(sprite)]
 
-    def get_sliding_windows(self, sprite: ColorBlockSprite) -> list:
-        result = []
-        for window in self.sliding_windows:
-            is_window_needed = True
-            temp_window = []
-            for offset in window:
-                temp_window.append((sprite.x + offset[0], sprite.y + offset[1]))
-                if not self.is_valid_coordinate(sprite.x + offset[0], sprite.y + offset[1]):
-                    is_window_needed = False
-                    break
-            if is_window_needed:
-                result.append(temp_window)
-        return result
+    def get_sliding_windows_at(self, x: int, y: int) -> tuple:
+        '''get_sliding_windows() for callers that only have the coordinates'''
+        index = x * self.dimension_y + y
+        if self.window_table[index] is None:
+            self.fill_cell(self.tables[(self.dimension_x, self.dimension_y)], index)
+        return self.window_table[index]
 
     def get_column_bottoms(self, coordinates: list) -> list:
         '''Group the input coordinates by columns and returns the bottom coordinate of each column'''
-        column_bottoms = [None] * 8
+        column_bottoms = [None] * self.dimension_x
         for coord in coordinates:
             x = coord[0]
             y = coord[1]
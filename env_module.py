@@ -0,0 +1,235 @@
+'''Reinforcement learning environments with the gym reset/step interface, played by BatchEngine.
+
+An action is one neighbor swap, numbered like the flattened BatchEngine.get_move_mask():
+
+    action = direction * dimension_x * dimension_y + x * dimension_y + y
+
+direction 0 swaps (x, y) with (x + 1, y), direction 1 swaps it with (x, y + 1).
+Observations are int8 color index arrays indexed [x][y] like GameManager.sprite_map. They are
+views onto the engine's boards, not copies, so they change in place on the next step or reset.
+'''
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from batch_module import BatchEngine, get_move_mask, swap_directions
+from game_manager import GameManager
+
+def get_action_count(dimension_x: int, dimension_y: int) -> int:
+    return len(swap_directions) * dimension_x * dimension_y
+
+def decode_actions(actions, dimension_x: int, dimension_y: int) -> tuple:
+    '''(coords_1, coords_2) of every action as (N, 2) arrays of (x, y)'''
+    actions = np.asarray(actions, dtype=np.intp).reshape(-1)
+    if actions.size > 0 and (actions.min() < 0 or actions.max() >= get_action_count(dimension_x, dimension_y)):
+        raise Exception(f'action out of range: {actions.min()}..{actions.max()}')
+    direction, cell = np.divmod(actions, dimension_x * dimension_y)
+    coords_1 = np.stack(np.divmod(cell, dimension_y), axis=1)
+    coords_2 = coords_1 + np.array(swap_directions)[direction]
+    return coords_1, coords_2
+
+class MatchEnv:
+    '''One game. step() returns (observation, reward, terminated, truncated, info), the game never
+    ends on its own, so an episode is only truncated after max_turns steps if that is set'''
+    def __init__(self,
+            dimension_x: int = GameManager.dimension_x,
+            dimension_y: int = GameManager.dimension_y,
+            color_count: int = len(GameManager.color_keys),
+            max_turns: int = None,
+            seed: int = None) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.action_count = get_action_count(dimension_x, dimension_y)
+        self.max_turns = max_turns
+        self.engine = BatchEngine(1, dimension_x, dimension_y, color_count, seeds=[seed] if seed is not None else None)
+        self.observation = self.engine.cells[0]
+        self.turn_count = 0
+
+    def reset(self, seed: int = None) -> tuple:
+        '''(observation, info), the board is generated like GameManager(seed=seed)'''
+        self.engine.reset([seed] if seed is not None else None)
+        self.turn_count = 0
+        return self.observation, {'seed': self.engine.seeds[0]}
+
+    def step(self, action: int) -> tuple:
+        coords_1, coords_2 = decode_actions(action, self.dimension_x, self.dimension_y)
+        reward, accepted = self.engine.step(coords_1, coords_2)
+        self.turn_count += 1
+        truncated = self.max_turns is not None and self.turn_count >= self.max_turns
+        info = {'accepted': bool(accepted[0]), 'reshuffled': bool(self.engine.reshuffled[0])}
+        return self.observation, float(reward[0]), False, truncated, info
+
+    def get_action_mask(self) -> np.ndarray:
+        '''Actions that would match, as a flat bool array'''
+        return self.engine.get_move_mask()[0].reshape(-1)
+
+    def get_score_info(self):
+        return self.engine.get_score_info(0)
+
+# arrays every worker shares with the vector env: name -> (dtype, shape after the env count)
+shared_layout = {
+    'cells': (np.int8, 'board'),
+    'actions': (np.int64, ()),
+    'rewards': (np.float64, ()),
+    'accepted': (np.bool_, ()),
+    'truncated': (np.bool_, ()),
+}
+
+def attach_arrays(names: dict, env_count: int, board_shape: tuple) -> tuple:
+    '''(shared memory blocks, arrays on them) of shared_layout'''
+    blocks = {}
+    arrays = {}
+    for key, (dtype, shape) in shared_layout.items():
+        shape = (env_count,) + (board_shape if shape == 'board' else shape)
+        blocks[key] = shared_memory.SharedMemory(name=names[key])
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf)
+    return blocks, arrays
+
+def run_worker(connection, names: dict, env_count: int, start: int, end: int,
+        dimension_x: int, dimension_y: int, color_count: int, max_turns: int) -> None:
+    '''Steps the environments start to end on the shared arrays whenever the vector env asks'''
+    blocks, arrays = attach_arrays(names, env_count, (dimension_x, dimension_y))
+    views = {key: array[start:end] for key, array in arrays.items()}
+    engine = BatchEngine(end - start, dimension_x, dimension_y, color_count, cells=views['cells'])
+    turn_counts = np.zeros(end - start, dtype=np.int64)
+    while True:
+        command, argument = connection.recv()
+        if command == 'close':
+            break
+        try:
+            if command == 'step':
+                coords_1, coords_2 = decode_actions(views['actions'], dimension_x, dimension_y)
+                views['rewards'][:], views['accepted'][:] = engine.step(coords_1, coords_2)
+                turn_counts += 1
+                truncated = views['truncated']
+                truncated[:] = max_turns is not None and turn_counts >= max_turns
+                # finished episodes start over right away, their observation is already the new board
+                done = np.flatnonzero(truncated)
+                if done.size > 0:
+                    engine.reset(None, done)
+                    turn_counts[done] = 0
+                connection.send(None)
+            elif command == 'reset':
+                engine.reset(argument)
+                turn_counts[:] = 0
+                connection.send(list(engine.seeds))
+            else:
+                raise Exception(f'unrecognized command: {command}')
+        except Exception as e:
+            connection.send(e)
+    # the blocks can only be closed once no array points into them
+    del engine, views, arrays
+    for block in blocks.values():
+        block.close()
+    connection.close()
+
+class SubprocessVectorEnv:
+    '''env_count games spread over worker processes. Boards, actions and rewards live in shared memory,
+    so a step sends the workers one short message each and nothing is copied back.
+    observations is a (env_count, dimension_x, dimension_y) view that every step updates in place.
+    Episodes that reach max_turns are reset by the step that truncates them'''
+    def __init__(self,
+            env_count: int,
+            dimension_x: int = GameManager.dimension_x,
+            dimension_y: int = GameManager.dimension_y,
+            color_count: int = len(GameManager.color_keys),
+            max_turns: int = None,
+            workers: int = None,
+            mp_context = None) -> None:
+        self.env_count = env_count
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.action_count = get_action_count(dimension_x, dimension_y)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, env_count))
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+
+        self.blocks = {}
+        arrays = {}
+        for key, (dtype, shape) in shared_layout.items():
+            shape = (env_count,) + ((dimension_x, dimension_y) if shape == 'board' else shape)
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self.blocks[key] = shared_memory.SharedMemory(create=True, size=size)
+            arrays[key] = np.ndarray(shape, dtype=dtype, buffer=self.blocks[key].buf)
+        self.observations = arrays['cells']
+        self.actions = arrays['actions']
+        self.rewards = arrays['rewards']
+        self.accepted = arrays['accepted']
+        self.truncated = arrays['truncated']
+        self.terminated = np.zeros(env_count, dtype=bool) # the game has no end state
+
+        names = {key: block.name for key, block in self.blocks.items()}
+        self.connections = []
+        self.processes = []
+        self.bounds = []
+        for w in range(workers):
+            start = env_count * w // workers
+            end = env_count * (w + 1) // workers
+            parent_connection, child_connection = mp_context.Pipe()
+            process = mp_context.Process(
+                target=run_worker,
+                args=(child_connection, names, env_count, start, end, dimension_x, dimension_y, color_count, max_turns),
+                daemon=True)
+            process.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+            self.bounds.append((start, end))
+        self.closed = False
+        # the workers generate their boards when they start, wait for them
+        self.reset()
+
+    def send_all(self, command: str, arguments: list = None) -> list:
+        for i, connection in enumerate(self.connections):
+            connection.send((command, arguments[i] if arguments is not None else None))
+        replies = [connection.recv() for connection in self.connections]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    def reset(self, seeds: list = None) -> tuple:
+        '''(observations, info) with a new board for every env, seeded like GameManager(seed=seeds[i])'''
+        arguments = None
+        if seeds is not None:
+            if len(seeds) != self.env_count:
+                raise Exception(f'{len(seeds)} seeds for {self.env_count} environments')
+            arguments = [list(seeds[start:end]) for start, end in self.bounds]
+        replies = self.send_all('reset', arguments)
+        return self.observations, {'seeds': [seed for reply in replies for seed in reply]}
+
+    def step(self, actions) -> tuple:
+        '''(observations, rewards, terminated, truncated, info), all views that the next step overwrites'''
+        decode_actions(actions, self.dimension_x, self.dimension_y) # raises on a bad action before the workers see it
+        self.actions[:] = actions
+        self.send_all('step')
+        return self.observations, self.rewards, self.terminated, self.truncated, {'accepted': self.accepted}
+
+    def get_action_masks(self) -> np.ndarray:
+        '''(env_count, action_count) bool array of the actions that would match'''
+        return get_move_mask(self.observations).reshape(self.env_count, -1)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for connection in self.connections:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self.connections:
+            connection.close()
+        self.observations = self.actions = self.rewards = self.accepted = self.truncated = None
+        for block in self.blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                pass # the caller still holds a view, the memory goes away with it
+            block.unlink()
@@ -0,0 +1,210 @@
+'''Compact per-turn event stream of a GameManager, so thin clients can replay the animation.
+
+Every event is a kind byte followed by unsigned varints (7 bits per byte, lowest group first).
+Signed values are zigzag encoded, cell lists are sorted flat indices (x * dimension_y + y)
+stored as differences from the previous index.
+
+    SWAP_ACCEPTED / SWAP_REJECTED   index_1, index_2
+    CLEAR                           count, indices
+    SPAWN                           x, count, colors in draw order (the i-th lands at y = -i - 1)
+    DROP                            x, count, (zigzag from_y, distance) from the bottom sprite up
+    SCORE                           zigzag total score change of the turn
+    RESHUFFLE                       every color of the board
+    TURN_END
+'''
+from game_manager import GameManager
+
+SWAP_ACCEPTED = 1
+SWAP_REJECTED = 2
+CLEAR = 3
+SPAWN = 4
+DROP = 5
+SCORE = 6
+RESHUFFLE = 7
+TURN_END = 8
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data, position: int) -> tuple:
+    '''(value, position after it)'''
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def unzigzag(value: int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+class TurnEventStream:
+    '''Collects the events GameManager emits. take_turns() hands out the bytes of the finished turns,
+    on_turn_end (if set) gets them as soon as a turn is over'''
+    def __init__(self, game_manager: GameManager, on_turn_end = None) -> None:
+        self.game_manager = game_manager
+        self.dimension_y = game_manager.dimension_y
+        self.on_turn_end = on_turn_end
+        self.buffer = bytearray()
+        self.turns = []
+        self.turn_start_score = game_manager.get_score_info().total_score
+        game_manager.event_stream = self
+
+    def get_index(self, coord: tuple) -> int:
+        return int(coord[0]) * self.dimension_y + int(coord[1])
+
+    def write_indices(self, indices: list) -> None:
+        write_varint(self.buffer, len(indices))
+        previous = 0
+        for index in sorted(indices):
+            write_varint(self.buffer, index - previous)
+            previous = index
+
+    def swap(self, coord1: tuple, coord2: tuple, accepted: bool) -> None:
+        self.buffer.append(SWAP_ACCEPTED if accepted else SWAP_REJECTED)
+        write_varint(self.buffer, self.get_index(coord1))
+        write_varint(self.buffer, self.get_index(coord2))
+
+    def clear(self, coords) -> None:
+        self.buffer.append(CLEAR)
+        self.write_indices([self.get_index(coord) for coord in coords])
+
+    def spawn(self, x: int, colors: list) -> None:
+        self.buffer.append(SPAWN)
+        write_varint(self.buffer, x)
+        write_varint(self.buffer, len(colors))
+        for color in colors:
+            write_varint(self.buffer, color)
+
+    def drop(self, x: int, moves: list) -> None:
+        '''moves are (from_y, to_y) of the sprites that move, bottom first'''
+        self.buffer.append(DROP)
+        write_varint(self.buffer, x)
+        write_varint(self.buffer, len(moves))
+        for from_y, to_y in moves:
+            write_varint(self.buffer, zigzag(int(from_y)))
+            write_varint(self.buffer, int(to_y - from_y))
+
+    def score(self, total_score: float) -> None:
+        # scores are whole numbers, the weights only add float noise
+        self.buffer.append(SCORE)
+        write_varint(self.buffer, zigzag(round(total_score - self.turn_start_score)))
+        self.turn_start_score = total_score
+
+    def reshuffle(self, cells: list) -> None:
+        self.buffer.append(RESHUFFLE)
+        for color in cells:
+            write_varint(self.buffer, color)
+
+    def turn_end(self) -> None:
+        self.buffer.append(TURN_END)
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        if self.on_turn_end is not None:
+            self.on_turn_end(data)
+        else:
+            self.turns.append(data)
+
+    def take_turns(self) -> list:
+        turns = self.turns
+        self.turns = []
+        return turns
+
+def read_indices(data, position: int) -> tuple:
+    count, position = read_varint(data, position)
+    indices = []
+    index = 0
+    for _ in range(count):
+        delta, position = read_varint(data, position)
+        index += delta
+        indices.append(index)
+    return indices, position
+
+def decode_events(data, dimension_x: int, dimension_y: int) -> list:
+    '''Events as tuples: (kind, ...) with cells as (x, y)'''
+    events = []
+    position = 0
+    while position < len(data):
+        kind = data[position]
+        position += 1
+        if kind == SWAP_ACCEPTED or kind == SWAP_REJECTED:
+            index_1, position = read_varint(data, position)
+            index_2, position = read_varint(data, position)
+            events.append((kind, divmod(index_1, dimension_y), divmod(index_2, dimension_y)))
+        elif kind == CLEAR:
+            indices, position = read_indices(data, position)
+            events.append((kind, [divmod(index, dimension_y) for index in indices]))
+        elif kind == SPAWN:
+            x, position = read_varint(data, position)
+            count, position = read_varint(data, position)
+            colors = []
+            for _ in range(count):
+                color, position = read_varint(data, position)
+                colors.append(color)
+            events.append((kind, x, colors))
+        elif kind == DROP:
+            x, position = read_varint(data, position)
+            count, position = read_varint(data, position)
+            moves = []
+            for _ in range(count):
+                from_y, position = read_varint(data, position)
+                distance, position = read_varint(data, position)
+                from_y = unzigzag(from_y)
+                moves.append((from_y, from_y + distance))
+            events.append((kind, x, moves))
+        elif kind == SCORE:
+            delta, position = read_varint(data, position)
+            events.append((kind, unzigzag(delta)))
+        elif kind == RESHUFFLE:
+            cells = []
+            for _ in range(dimension_x * dimension_y):
+                color, position = read_varint(data, position)
+                cells.append(color)
+            events.append((kind, cells))
+        elif kind == TURN_END:
+            events.append((kind,))
+        else:
+            raise Exception(f'unrecognized event kind: {kind}')
+    return events
+
+def apply_events(cells: list, events: list, dimension_y: int) -> int:
+    '''Plays decoded events on a flat board of color indices the way a client would animate them.
+    Returns the score change'''
+    score = 0
+    spawned = {} # x -> colors waiting above the column, index i is at y = -i - 1
+    for event in events:
+        kind = event[0]
+        if kind == SWAP_ACCEPTED:
+            index_1 = event[1][0] * dimension_y + event[1][1]
+            index_2 = event[2][0] * dimension_y + event[2][1]
+            cells[index_1], cells[index_2] = cells[index_2], cells[index_1]
+        elif kind == CLEAR:
+            for x, y in event[1]:
+                cells[x * dimension_y + y] = -1
+        elif kind == SPAWN:
+            spawned[event[1]] = event[2]
+        elif kind == DROP:
+            x = event[1]
+            start = x * dimension_y
+            colors = spawned.pop(x, [])
+            column = {y: cells[start + y] for y in range(dimension_y)}
+            column.update({-i - 1: color for i, color in enumerate(colors)})
+            new_column = dict(column)
+            for from_y, to_y in event[2]:
+                new_column[to_y] = column[from_y]
+            for y in range(dimension_y):
+                cells[start + y] = new_column[y]
+        elif kind == SCORE:
+            score += event[1]
+        elif kind == RESHUFFLE:
+            cells[:] = event[1]
+    return score
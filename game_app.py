@@ -2,27 +2,91 @@
 
 # Import and initialize the pygame library
 import pygame
+import getpass
+import multiprocessing
+import sys
+from time import perf_counter
 from game_object import GameStatus
-from sprite_manager import ColorBlockSprite
+from sprite_manager import ColorBlockSprite, alpha_table
 
 from game_manager import GameManager
+from generator_module import BoardGenerator, BoardPool
+from render_module import TextRenderer, DirtyRectRenderer, BlockAtlas
+from scheduler_module import FixedStepScheduler
+from profile_module import profiler
+from replay_module import InputRecorder
+from highscore_module import HighScoreStore, ScoreRecorder
+from solver_module import MoveSolver
 
-pygame.init()
+# python game_app.py 64 plays on a 64x64 board, --solver-workers 4 plays auto moves (A) on 4 processes
+board_size = 8
+solver_workers = 1
+args = sys.argv[1:]
+while len(args) > 0:
+    arg = args.pop(0)
+    if arg == '--solver-workers':
+        solver_workers = int(args.pop(0))
+    else:
+        board_size = int(arg)
+
+# the solver is only made once auto play is first turned on, in this process unless asked for workers.
+# Those are forked here, while this is still the only thread: pygame, the board pool and the
+# background solver thread all start threads later. Spawned workers are not an option
+# because this file is a plain script, they would run the game again when importing it
+solver = None
+if solver_workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+    solver = MoveSolver(board_size, board_size, len(GameManager.color_keys),
+        workers=solver_workers, mp_context=multiprocessing.get_context('fork'))
+    solver.start_workers()
+solver_future = None
 
-block_size = 80
+pygame.init()
+board_length = 640 # pixels, blocks shrink to fit bigger boards
+block_size = max(1, board_length // board_size)
 panel_length = 300
+panel_x = block_size * board_size + 10
 # Set up the drawing window
-screen = pygame.display.set_mode([block_size * 8 + panel_length, block_size * 8])
+screen = pygame.display.set_mode([block_size * board_size + panel_length, max(block_size * board_size, board_length)])
 
 # Run until the user asks to quit
 running = True
 fps_clock = pygame.time.Clock()
+display_fps = 60
+auto_play_poll_ms = 100 # how often an idle loop wakes up to check for the solver's move
+pygame.event.set_blocked(pygame.MOUSEMOTION) # never used, it would only wake the idle loop
+frame_time = 0.0 # seconds since the previous display frame
+# the logic runs at GameManager.tick_rate no matter how fast the display goes
+scheduler = FixedStepScheduler(1 / GameManager.tick_rate)
+blend = 1.0
 debug_mode = False
+profile_overlay = False
+auto_play = False
 
 debug_msg = ''
 debug_coord = None
 
-gm = GameManager()
+board_pool = BoardPool(BoardGenerator(board_size, board_size, len(GameManager.color_dict)))
+
+high_score_store = HighScoreStore()
+player_name = getpass.getuser()
+best_session = high_score_store.player_best(player_name)
+best_score = best_session['total_score'] if best_session is not None else 0
+
+def new_game() -> GameManager:
+    '''A new game whose inputs are recorded, S saves them for replay_module.
+    Its scores go to the local leaderboard'''
+    game = GameManager(board_pool=board_pool, dimension_x=board_size, dimension_y=board_size)
+    InputRecorder(game, scheduler.step)
+    ScoreRecorder(high_score_store, game, player_name)
+    return game
+
+def finish_game() -> None:
+    global best_score
+    gm.score_recorder.finish()
+    best_score = max(best_score, gm.get_score_info().total_score)
+
+gm = new_game()
+
 img_dict = {}
 color_keys = [
     'red',
@@ -37,80 +101,153 @@ for color in color_keys:
     img = pygame.image.load(f'./img/{color}.png')
     img = pygame.transform.scale(img, (block_size, block_size))
     img_dict[color] = img
+block_atlas = BlockAtlas(img_dict, alpha_table)
+
+text_renderer = TextRenderer("./Font/msjh.ttf")
+renderer = DirtyRectRenderer(screen, text_renderer)
 
 def draw_block(block_sprite: ColorBlockSprite) -> None:
     if block_sprite.cleared:
         return
-    color_key = block_sprite.color
-    img = img_dict[color_key]
-    img.set_alpha(block_sprite.alpha)
-    screen.blit(
-        img,
-        (block_sprite.x * block_size, block_sprite.y * block_size)
-    )
+    x, y = block_sprite.get_render_coord(blend, scheduler.step)
+    renderer.add_atlas_block(
+        block_atlas,
+        block_sprite.color,
+        block_sprite.alpha,
+        x * block_size,
+        y * block_size)
 
 def draw_text(text: str, x: int, y: int, size: int, alpha: int) -> None:
-    myfont = pygame.font.Font("./Font/msjh.ttf", size, bold=True)
-    label = myfont.render(text, 1, (0,0,0))
-    label.set_alpha(alpha)
-    screen.blit(label, (x, y))
+    renderer.add_text(text, x, y, size, alpha)
+
+def end_section(name: str, start: float) -> float:
+    '''Records the time since start when profiling and returns the start of the next section'''
+    now = perf_counter()
+    if profiler.enabled:
+        profiler.add_timing(name, now - start)
+    return now
 
 start_text_alpha = 255
-start_text_alpha_change = -8
+start_text_alpha_change = -320 # per second
+def get_wait_ms() -> int:
+    '''How long the loop may block on input, None while something is animating'''
+    if gm.game_status == GameStatus.WaitingStart: # the start text blinks
+        return None
+    timeout = gm.get_idle_timeout()
+    if timeout == 0:
+        return None
+    if auto_play:
+        return auto_play_poll_ms if timeout is None else min(auto_play_poll_ms, max(1, int(timeout * 1000)))
+    return 0 if timeout is None else max(1, int(timeout * 1000)) # 0 waits until the next event
+
+def wait_events(wait_ms: int) -> list:
+    '''Sleeps until input arrives or wait_ms passes, then lets the game catch up on its timer'''
+    wait_start = perf_counter()
+    event = pygame.event.wait(wait_ms)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    if gm.get_idle_timeout() is None:
+        scheduler.reset()
+    else:
+        # a faded score still counts down, its steps run in one go
+        scheduler.catch_up(perf_counter() - wait_start, gm.process_frame)
+    fps_clock.tick() # the time spent waiting is not frame time
+    return events + pygame.event.get()
+
 while running:
+    section_start = perf_counter()
+
+    wait_ms = get_wait_ms()
+    if wait_ms is not None:
+        events = wait_events(wait_ms)
+        frame_time = 0.0
+    else:
+        events = pygame.event.get()
 
     # Did the user click the window close button?
-    for event in pygame.event.get():
+    for event in events:
         if event.type == pygame.QUIT:
             running = False
         if event.type == pygame.MOUSEBUTTONUP:
             pos = pygame.mouse.get_pos()
             x = pos[0] // block_size
             y = pos[1] // block_size
-            if debug_mode:
+            if debug_mode and gm.coord_helper.is_valid_coordinate(x, y):
                 debug_msg = gm.sprite_map[x][y].get_sprite_info()
                 debug_coord = (x, y)
-            else:
+            elif gm.game_status == GameStatus.Idle:
+                # selecting while blocks move would swap the moving sprites away
                 gm.set_selection(x, y)
         if event.type == pygame.KEYUP:
             if event.key == pygame.K_SPACE:
-                gm = GameManager()
+                finish_game()
+                gm = new_game()
+                solver_future = None
             if event.key == pygame.K_d:
                 debug_mode = not debug_mode
+            if event.key == pygame.K_p:
+                profile_overlay = not profile_overlay
+                profiler.enabled = profile_overlay
+                profiler.reset()
+            if event.key == pygame.K_j:
+                with open('profile_snapshot.json', 'w') as f:
+                    f.write(profiler.to_json())
             if event.key == pygame.K_RETURN:
-                gm.game_status = GameStatus.Idle
+                gm.start_game()
+            if event.key == pygame.K_s:
+                gm.input_recorder.save(f'session-{gm.seed}.json')
+            if event.key == pygame.K_h and gm.game_status == GameStatus.Idle:
+                gm.get_hint()
+            if event.key == pygame.K_a:
+                auto_play = not auto_play
+                solver_future = None
+                if solver is None:
+                    solver = MoveSolver(board_size, board_size, len(GameManager.color_keys), workers=1)
 
     if gm.game_status == GameStatus.Initializing:
+        frame_time = fps_clock.tick(display_fps) / 1000
         continue
     if gm.game_status == GameStatus.WaitingStart:
         screen_size =  screen.get_size()
         x = screen_size[0] / 2
         y = screen_size[1] / 2 
-        screen.fill((255, 255, 255))
-        draw_text("按下 Enter 開始遊戲", x - 100, y - 50, 24, start_text_alpha)
-        start_text_alpha += start_text_alpha_change
+        draw_text("按下 Enter 開始遊戲", x - 100, y - 50, 24, int(max(0, min(start_text_alpha, 255))))
+        start_text_alpha += start_text_alpha_change * frame_time
         if start_text_alpha < 0:
-            start_text_alpha_change = 8
+            start_text_alpha_change = 320
         elif start_text_alpha > 255:
-            start_text_alpha_change = -8.
-        pygame.display.flip()
-        fps_clock.tick(40)
+            start_text_alpha_change = -320
+        pygame.display.update(renderer.flush())
+        frame_time = fps_clock.tick(display_fps) / 1000
         continue
 
-    gm.process_frame()
-
-    # Fill the background with white
-    screen.fill((255, 255, 255))
-    draw_text("Game Status", 650, 50, 20, 255)
-    draw_text(str(gm.game_status).replace("GameStatus.", ""), 650, 75, 16, 255)
-    draw_text("最高 Combo", 650, 150, 20, 255)
-    draw_text(str(gm.score_sprite.score_info.max_combo), 650, 175, 20, 255)
-    draw_text("最高消除個數", 650, 250, 20, 255)
-    draw_text(str(gm.score_sprite.score_info.max_matched_count), 650, 275, 20, 255)
-    draw_text("總分數", 650, 350, 20, 255)
-    draw_text(str(int(gm.score_sprite.score_info.total_score)), 650, 375, 20, 255)
-    # draw_text(str(debug_coord), 650, 200, 20)
-    # draw_text(debug_msg, 650, 300, 20)
+    if auto_play and gm.game_status == GameStatus.Idle:
+        if solver_future is None:
+            solver_future = solver.submit_choose_move(gm.get_color_cells())
+        elif solver_future.done():
+            move = solver_future.result()
+            solver_future = None
+            # a half finished manual selection would pair with the solver's first cell, ask again later
+            if move is not None and gm.selected_sprite_1 is None:
+                gm.set_selection(move[0][0], move[0][1])
+                gm.set_selection(move[1][0], move[1][1])
+
+    section_start = end_section('frame.events', section_start)
+    blend = scheduler.advance(frame_time, gm.process_frame)
+    section_start = end_section('frame.logic', section_start)
+
+    # only the parts that differ from the last frame are repainted on the white background
+    draw_text("Game Status", panel_x, 50, 20, 255)
+    draw_text(str(gm.game_status).replace("GameStatus.", ""), panel_x, 75, 16, 255)
+    draw_text("最高 Combo", panel_x, 150, 20, 255)
+    draw_text(str(gm.score_sprite.score_info.max_combo), panel_x, 175, 20, 255)
+    draw_text("最高消除個數", panel_x, 250, 20, 255)
+    draw_text(str(gm.score_sprite.score_info.max_matched_count), panel_x, 275, 20, 255)
+    draw_text("總分數", panel_x, 350, 20, 255)
+    draw_text(str(int(gm.score_sprite.score_info.total_score)), panel_x, 375, 20, 255)
+    draw_text("歷史最高分", panel_x, 570, 20, 255)
+    draw_text(str(int(max(best_score, gm.score_sprite.score_info.total_score))), panel_x, 595, 20, 255)
+    # draw_text(str(debug_coord), panel_x, 200, 20)
+    # draw_text(debug_msg, panel_x, 300, 20)
 
     # Draw a solid blue circle in the center
     # pygame.draw.circle(screen, (0, 255, 255), (250, 250), 75)
@@ -118,23 +255,42 @@ while running:
         for sprite in column:
             draw_block(sprite)
 
+    if gm.hint_coords is not None:
+        for coord in gm.hint_coords:
+            renderer.add_outline(
+                (coord[0] * block_size, coord[1] * block_size, block_size, block_size),
+                (0, 0, 0),
+                3)
+
     if gm.score_sprite.alpha > 0:
         draw_text(
             str(gm.score_sprite.score_info.turn_combo) + "COMBO!!",
             gm.score_sprite.x * block_size,
             gm.score_sprite.y * block_size,
             40,
-            gm.score_sprite.alpha)
+            int(gm.score_sprite.alpha))
         draw_text(
             str(gm.score_sprite.score_info.turn_score),
             gm.score_sprite.x * block_size,
             gm.score_sprite.y * block_size + block_size / 2,
             40,
-            gm.score_sprite.alpha)
+            int(gm.score_sprite.alpha))
+
+    if profile_overlay:
+        for i, line in enumerate(profiler.get_summary_lines(8)):
+            draw_text(line, panel_x, 430 + i * 15, 12, 255)
+    section_start = end_section('frame.draw', section_start)
 
-    # Flip the display
-    pygame.display.flip()
-    fps_clock.tick(40)
+    # Push the changed rectangles to the display
+    dirty_rects = renderer.flush()
+    section_start = end_section('frame.paint', section_start)
+    pygame.display.update(dirty_rects)
+    section_start = end_section('frame.display_update', section_start)
+    frame_time = fps_clock.tick(display_fps) / 1000
 
 # Done! Time to quit.
+finish_game()
+high_score_store.close()
+if solver is not None:
+    solver.shutdown()
 pygame.quit()
@@ -1,25 +1,31 @@
 
-from random import randint
+from collections import deque
+from itertools import islice
+from time import perf_counter
+from random import Random, randrange
+from move_module import MoveFinder
+from generator_module import BoardGenerator, BoardPool
 from sprite_manager import ScoreSprite
 from score_module import ScoreInfo
-from sprite_manager import ColorBlockSprite
+from sprite_manager import ColorBlockSprite, SpritePool
 from game_object import GameStatus
 from score_module import ScoreHelper
 from coordinate_module import ColorCheckRangeEnum, CoordinateHelper
+from profile_module import profiler
 
 
 class GameManager:
+    # class attributes are settings shared by every game, anything a game changes is set in __init__
     dimension_x = 8
     dimension_y = 8
-    score = 0
-    frame_delay = 28
-    sprite_map = []
-    sprites_to_check = []
-    matched_coords = set()
-    selected_sprite_1: ColorBlockSprite = None
-    selected_sprite_2: ColorBlockSprite = None
-    score_sprite = ScoreSprite(0, 0, 0.03, 'black')
-    game_status = GameStatus.Initializing
+    # all timing is in seconds, the logic runs in fixed steps of 1 / tick_rate
+    tick_rate = 40
+    time_epsilon = 1e-6
+    block_speed = 2.4 # cells per second
+    match_show_duration = 0.7
+    clear_duration = 0.7
+    turn_score_duration = 2.25
+    max_reshuffle_count = 1000
     color_dict = {
         'red': (255, 0, 0),
         'green': (0, 255, 0),
@@ -28,174 +34,297 @@ class GameManager:
         'purple': (255, 0, 255),
         'pink': (128, 255, 255),
     }
+    color_keys = list(color_dict.keys())
+    color_index = {color: i for i, color in enumerate(color_keys)}
+    # states in which nothing changes until the player does something
+    resting_statuses = (GameStatus.Initializing, GameStatus.WaitingStart, GameStatus.Idle)
+    # method run by process_frame in each state
+    state_actions = {
+        GameStatus.Initializing: 'process_skip',
+        GameStatus.WaitingStart: 'process_skip',
+        GameStatus.Idle: 'process_skip',
+        GameStatus.SwapingForward: 'process_swap_forward',
+        GameStatus.SwapingBack: 'process_swap_back',
+        GameStatus.ShowingFirstMatched: 'process_show_first_matched',
+        GameStatus.ClearingFirstMatched: 'process_clear_first_matched',
+        GameStatus.AnimatingFirstClear: 'process_animate_first_clear',
+        GameStatus.ReAligningBlock: 'process_realign_block',
+        GameStatus.AnimatingReAlign: 'process_animate_realign',
+        GameStatus.NewBlockCreating: 'process_new_block_create',
+        GameStatus.DroppedBlockMatching: 'process_drop_matching',
+        GameStatus.ShowingDroppedMatch: 'process_show_drop_matched',
+        GameStatus.ClearingDroppedMatch: 'process_clear_drop_matched',
+        GameStatus.AnimatingDroppedClear: 'process_animate_dropped_clear',
+        GameStatus.ShowTurnScore: 'process_show_turn_score',
+    }
 
-    def __init__(self) -> None:
+    def __init__(self,
+            verbose: bool = True,
+            use_array_board: bool = False,
+            board_pool: BoardPool = None,
+            seed: int = None,
+            dimension_x: int = None,
+            dimension_y: int = None,
+            use_bitboard: bool = False) -> None:
+        self.verbose = verbose
+        self.game_status = GameStatus.Initializing
+        self.state_time_left = 0.0
+        self.sprite_map = []
+        self.sprites_to_check = []
+        self.matched_coords = set()
+        self.changed_coords = set()
+        self.selected_sprite_1: ColorBlockSprite = None
+        self.selected_sprite_2: ColorBlockSprite = None
+        self.hint_coords: tuple = None
+        self.known_move: tuple = None # a swap that was valid at the last dead board check
+        self.score_sprite = ScoreSprite(0, 0, 1.2, 'black')
+        if dimension_x is not None:
+            self.dimension_x = dimension_x
+        if dimension_y is not None:
+            self.dimension_y = dimension_y
+        # a pooled board comes with its own seed, an explicit seed always generates the board here
+        self.board_pool = board_pool if seed is None else None
+        if seed is None:
+            seed = randrange(2 ** 63)
+        self.seed = seed
+        self.rng = Random(seed)
+        self.tick_count = 0 # process_frame calls so far, recorded inputs refer to it
+        self.input_recorder = None
+        self.event_stream = None
+        self.score_recorder = None
         self.score_helper = ScoreHelper()
         self.coord_helper = CoordinateHelper(self.dimension_x, self.dimension_y)
+        self.move_finder = MoveFinder.for_size(self.dimension_x, self.dimension_y)
+        self.board_generator = BoardGenerator(self.dimension_x, self.dimension_y, len(self.color_keys))
+        self.sprite_pool = SpritePool()
+        # the cascade only touches these, so its cost follows the cleared cells instead of the board size
+        self.cleared_columns = {} # x -> (cleared count, lowest cleared row) of the current wave
+        self.dropping_sprites = []
+        self.highlighted_sprites = []
         self.init_cell_map()
-        self.action_dict = {
-            GameStatus.Initializing: self.process_skip,
-            GameStatus.WaitingStart: self.process_skip,
-            GameStatus.Idle: self.process_skip,
-            GameStatus.SwapingForward: self.process_swap_forward,
-            GameStatus.SwapingBack: self.process_swap_back,
-            GameStatus.ShowingFirstMatched: self.process_show_first_matched,
-            GameStatus.ClearingFirstMatched: self.process_clear_first_matched,
-            GameStatus.AnimatingFirstClear: self.process_animate_first_clear,
-            GameStatus.ReAligningBlock: self.process_realign_block,
-            GameStatus.AnimatingReAlign: self.process_animate_realign,
-            GameStatus.NewBlockCreating: self.process_new_block_create,
-            GameStatus.DroppedBlockMatching: self.process_drop_matching,
-            GameStatus.ShowingDroppedMatch: self.process_show_drop_matched,
-            GameStatus.ClearingDroppedMatch: self.process_clear_drop_matched,
-            GameStatus.AnimatingDroppedClear: self.process_animate_dropped_clear,
-            GameStatus.ShowTurnScore: self.process_show_turn_score
-        }
+        # optional mirror of the colors that does the matching, sprites stay as the view layer for animation
+        self.color_board = None
+        if use_array_board:
+            from board_module import ArrayBoard
+            self.color_board = ArrayBoard.from_sprite_map(self.sprite_map, self.color_keys)
+        elif use_bitboard:
+            from bitboard_module import BitBoard
+            self.color_board = BitBoard.from_sprite_map(self.sprite_map, self.color_keys)
+        self.reshuffle_if_dead()
         self.game_status = GameStatus.WaitingStart
 
     def init_cell_map(self) -> None:
+        if self.board_pool is not None:
+            self.seed, cells, rng_state = self.board_pool.get()
+            self.rng.setstate(rng_state)
+            self.board_pool = None # a reshuffle fallback has to regenerate from self.rng
+        else:
+            cells = self.board_generator.generate(self.rng)
         self.sprite_map = []
-        for _ in range(0, self.dimension_x):
-            self.sprite_map.append([None] * self.dimension_y)
         for x in range(0, self.dimension_x):
+            # columns are deques so new sprites are added on top in O(1)
+            column = deque()
             for y in range(0, self.dimension_y):
-                available_colors = self.get_available_color(x, y)
-                rand_index = randint(0, len(available_colors) - 1)
-                color = available_colors[rand_index]
-                self.sprite_map[x][y] = ColorBlockSprite(x, y, 0.06, color)
-
-    def process_frame(self) -> None:
-        if self.game_status not in self.action_dict:
-            raise Exception(f'unrecognized game status: {self.game_status}')
-        self.action_dict[self.game_status]()
+                color = self.color_keys[cells[x * self.dimension_y + y]]
+                column.append(self.sprite_pool.acquire(x, y, self.block_speed, color))
+            self.sprite_map.append(column)
+
+    def process_frame(self, dt: float = None) -> None:
+        '''Advances the current state by dt seconds, one logic step by default'''
+        if dt is None:
+            dt = 1 / self.tick_rate
+        status = self.game_status
+        if status not in self.state_actions:
+            raise Exception(f'unrecognized game status: {status}')
+        self.tick_count += 1
+        action = getattr(self, self.state_actions[status])
+        if profiler.enabled:
+            start = perf_counter()
+            action(dt)
+            profiler.add_timing(f'state.{status.name}', perf_counter() - start)
+            return
+        action(dt)
+
+    def is_animating(self) -> bool:
+        '''True while sprites move or fade, so the display has to keep redrawing'''
+        if self.game_status in self.resting_statuses:
+            return False
+        if self.game_status == GameStatus.ShowTurnScore:
+            return self.score_sprite.alpha > 0
+        return True
 
-    def process_skip(self) -> None:
+    def get_idle_timeout(self) -> float:
+        '''Seconds the game can go without process_frame before anything changes.
+        0 while animating, None if only input can change the game'''
+        if self.is_animating():
+            return 0.0
+        if self.game_status in self.resting_statuses:
+            return None
+        return max(self.state_time_left, 0.0)
+
+    def start_timer(self, duration: float) -> None:
+        self.state_time_left = duration
+
+    def count_down(self, dt: float) -> bool:
+        '''Returns True once the state timer has run out'''
+        self.state_time_left -= dt
+        return self.state_time_left <= self.time_epsilon
+
+    def get_alpha_frame(self) -> int:
+        '''Index into sprite_manager.alpha_table for the time left in the state'''
+        frame = round(self.state_time_left * self.tick_rate)
+        return max(0, min(frame, int(self.match_show_duration * self.tick_rate) - 1))
+
+    def process_skip(self, dt: float) -> None:
         return
 
-    def process_swap_forward(self) -> None:
-        self.selected_sprite_1.process_frame()
-        self.selected_sprite_2.process_frame()
+    def process_swap_forward(self, dt: float) -> None:
+        self.selected_sprite_1.process_frame(dt)
+        self.selected_sprite_2.process_frame(dt)
         if self.selected_sprite_1.reached_destination() and self.selected_sprite_2.reached_destination():
             coord1 = self.selected_sprite_1.get_coord()
             coord2 = self.selected_sprite_2.get_coord()
             self.swap_sprite(coord1, coord2)
-            if self.has_match(self.selected_sprite_1) or self.has_match(self.selected_sprite_2):
+            accepted = self.has_swap_match()
+            if self.event_stream is not None:
+                self.event_stream.swap(coord1, coord2, accepted)
+            if accepted:
                 self.sprites_to_check = [self.selected_sprite_1, self.selected_sprite_2]
                 self.show_matched_sprites(self.sprites_to_check)
                 self.game_status = GameStatus.ShowingFirstMatched
-                self.frame_delay = 28
+                self.start_timer(self.match_show_duration)
             else:
                 self.selected_sprite_1.set_destination_by_sprite(self.selected_sprite_2)
                 self.selected_sprite_2.set_destination_by_sprite(self.selected_sprite_1)
                 self.game_status = GameStatus.SwapingBack
 
-    def process_swap_back(self) -> None:
-        self.selected_sprite_1.process_frame()
-        self.selected_sprite_2.process_frame()
+    def process_swap_back(self, dt: float) -> None:
+        self.selected_sprite_1.process_frame(dt)
+        self.selected_sprite_2.process_frame(dt)
         if self.selected_sprite_1.reached_destination() and self.selected_sprite_2.reached_destination():
             self.swap_sprite(self.selected_sprite_1.get_coord(), self.selected_sprite_2.get_coord())
+            if self.color_board is not None:
+                self.color_board.clear_dirty()
             self.selected_sprite_1 = None
             self.selected_sprite_2 = None
             self.game_status = GameStatus.Idle
+            if self.event_stream is not None:
+                self.event_stream.turn_end()
 
-    def process_show_first_matched(self) -> None:
-        self.frame_delay -= 1
-        self.set_matched_sprite_alpha(self.frame_delay)
-        if self.frame_delay == 0:
+    def process_show_first_matched(self, dt: float) -> None:
+        done = self.count_down(dt)
+        self.set_matched_sprite_alpha(self.get_alpha_frame())
+        if done:
             self.game_status = GameStatus.ClearingFirstMatched
 
-    def process_clear_first_matched(self) -> None:
+    def process_clear_first_matched(self, dt: float) -> None:
         self.clear_matched_blocks(self.sprites_to_check, True)
         self.selected_sprite_1 = None
         self.selected_sprite_2 = None
         self.game_status = GameStatus.AnimatingFirstClear
-        self.frame_delay = 28
+        self.start_timer(self.clear_duration)
 
-    def process_animate_first_clear(self) -> None:
-        self.frame_delay -= 1
-        if self.frame_delay == 0:
+    def process_animate_first_clear(self, dt: float) -> None:
+        if self.count_down(dt):
             self.game_status = GameStatus.NewBlockCreating
 
-    def process_new_block_create(self) -> None:
+    def process_new_block_create(self, dt: float) -> None:
         available_colors = list(self.color_dict.keys())
-        for x in range(0, self.dimension_x):
+        for x in sorted(self.cleared_columns):
             column = self.sprite_map[x]
-            cleared_count = sum(i.cleared for i in column)
+            cleared_count = self.cleared_columns[x][0]
+            spawned_colors = []
             for i in range(cleared_count):
-                rand_index = randint(0, len(available_colors) - 1)
+                rand_index = self.rng.randint(0, len(available_colors) - 1)
                 color = available_colors[rand_index]
-                column.insert(0, ColorBlockSprite(x, 0 - i -1, 0.06, color))
+                column.appendleft(self.sprite_pool.acquire(x, 0 - i -1, self.block_speed, color))
+                spawned_colors.append(rand_index)
+            if self.event_stream is not None:
+                self.event_stream.spawn(x, spawned_colors)
         self.game_status = GameStatus.ReAligningBlock
 
-    def process_realign_block(self) -> None:
+    def process_realign_block(self, dt: float) -> None:
         self.set_drop_destination()
         self.game_status = GameStatus.AnimatingReAlign
 
-    def process_animate_realign(self) -> None:
+    def process_animate_realign(self, dt: float) -> None:
         not_reached_count = 0
-        for column in self.sprite_map:
-            cleared_count = sum(s.cleared for s in column)
-            if cleared_count == 0:
-                continue
-            for sprite in column:
-                sprite.process_frame()
-                if not sprite.reached_destination():
-                    not_reached_count += 1
+        for sprite in self.dropping_sprites:
+            sprite.process_frame(dt)
+            if not sprite.reached_destination():
+                not_reached_count += 1
         if not_reached_count == 0:
             self.remove_cleared_sprites()
             self.game_status = GameStatus.DroppedBlockMatching
 
-    def process_drop_matching(self) -> None:
-        self.sprites_to_check = []
-        start_corrds = self.coord_helper.get_column_bottoms(self.matched_coords)
-        for coord in start_corrds:
-            x = coord[0]
-            for y in range(coord[1], - 1, -1):
-                self.sprites_to_check.append(self.sprite_map[x][y])
-        any_match = False
-        for sprite in self.sprites_to_check:
-            if self.has_match(sprite):
-                any_match = True
-                break
+    def process_drop_matching(self, dt: float) -> None:
+        # only cells that were cleared or changed color can be part of a new match
+        self.sprites_to_check = [self.get_sprite_by_coord(coord) for coord in self.changed_coords]
+        if self.color_board is not None:
+            any_match = len(self.color_board.get_dirty_matched_coordinates()) > 0
+        else:
+            any_match = any(self.has_match(sprite) for sprite in self.sprites_to_check)
 
         if any_match:
             self.show_matched_sprites(self.sprites_to_check)
             self.game_status = GameStatus.ShowingDroppedMatch
-            self.frame_delay = 28
+            self.start_timer(self.match_show_duration)
         else:
+            if self.color_board is not None:
+                self.color_board.clear_dirty()
             score_info = self.score_helper.get_score_info()
+            if self.event_stream is not None:
+                self.event_stream.score(score_info.total_score)
+            if self.score_recorder is not None:
+                self.score_recorder.turn_end(score_info)
             coordinate = self.coord_helper.get_score_sprite_coord(self.matched_coords)
             self.score_sprite.set_score(coordinate, score_info)
             self.game_status = GameStatus.ShowTurnScore
-            self.frame_delay = 90
+            self.start_timer(self.turn_score_duration)
 
-    def process_show_drop_matched(self) -> None:
-        self.frame_delay -= 1
-        self.set_matched_sprite_alpha(self.frame_delay)
-        if self.frame_delay == 0:
+    def process_show_drop_matched(self, dt: float) -> None:
+        done = self.count_down(dt)
+        self.set_matched_sprite_alpha(self.get_alpha_frame())
+        if done:
             self.game_status = GameStatus.ClearingDroppedMatch
 
-    def process_clear_drop_matched(self) -> None:
+    def process_clear_drop_matched(self, dt: float) -> None:
         self.clear_matched_blocks(self.sprites_to_check, False)
         self.game_status = GameStatus.AnimatingDroppedClear
-        self.frame_delay = 28
+        self.start_timer(self.clear_duration)
 
-    def process_animate_dropped_clear(self) -> None:
-        self.frame_delay -= 1
-        if self.frame_delay == 0:
+    def process_animate_dropped_clear(self, dt: float) -> None:
+        if self.count_down(dt):
             self.game_status = GameStatus.NewBlockCreating
 
-    def process_show_turn_score(self) -> None:
-        self.score_sprite.process_frame()
-        self.frame_delay -= 1
-        if self.frame_delay == 0:
+    def process_show_turn_score(self, dt: float) -> None:
+        self.score_sprite.process_frame(dt)
+        if self.count_down(dt):
+            reshuffled = self.reshuffle_if_dead()
             self.game_status = GameStatus.Idle
+            if self.event_stream is not None:
+                if reshuffled:
+                    self.event_stream.reshuffle(self.get_color_cells())
+                self.event_stream.turn_end()
 
     def has_match(self, sprite: ColorBlockSprite):
+        if profiler.enabled:
+            profiler.count('has_match')
         matched_dict = self.get_matched_coordinates(sprite)
         return len(matched_dict) > 0
 
+    def has_swap_match(self) -> bool:
+        if self.color_board is not None:
+            return len(self.color_board.get_dirty_matched_coordinates()) > 0
+        return self.has_match(self.selected_sprite_1) or self.has_match(self.selected_sprite_2)
+
     def show_matched_sprites(self, sprites: list) -> None:
+        if self.color_board is not None:
+            for coord in self.color_board.get_dirty_matched_coordinates():
+                sprite = self.sprite_map[coord[0]][coord[1]]
+                sprite.hilighted = True
+                self.highlighted_sprites.append(sprite)
+            return
         for sprite in sprites:
             if self.has_match(sprite):
                 self.set_matched_highlight(sprite)
@@ -233,18 +362,106 @@ class GameManager:
                     color_histogram[temp_cell.color] += 1
         return color_histogram
 
+    def get_color_cells(self) -> list:
+        '''Color indices of the board, flattened column by column'''
+        if self.color_board is not None:
+            return self.color_board.to_cells()
+        return [self.color_index[sprite.color] for column in self.sprite_map for sprite in column]
+
+    def get_valid_moves(self) -> list:
+        return self.move_finder.get_valid_moves(self.get_color_cells())
+
+    def get_hint(self) -> tuple:
+        '''A valid swap as a pair of coordinates, None if the board has no move left'''
+        self.hint_coords = self.move_finder.find_first_move(self.get_color_cells())
+        return self.hint_coords
+
+    def is_dead_board(self) -> bool:
+        # a turn only changes a few cells of a big board, so the last known move usually still works
+        # or a new one sits next to the changes. Only when neither does the whole board get scanned
+        if self.known_move is not None and self.is_valid_swap(*self.known_move):
+            return False
+        self.known_move = self.find_move_near(self.changed_coords)
+        if self.known_move is None:
+            self.known_move = self.move_finder.find_first_move(self.get_color_cells())
+        return self.known_move is None
+
+    def is_valid_swap(self, coord1: tuple, coord2: tuple) -> bool:
+        '''True if swapping the two neighbors makes a run, checked on the sprites without copying the board'''
+        sprite_map = self.sprite_map
+        swapped_colors = {
+            coord1: sprite_map[coord2[0]][coord2[1]].color,
+            coord2: sprite_map[coord1[0]][coord1[1]].color,
+        }
+        if swapped_colors[coord1] == swapped_colors[coord2]:
+            return False
+        for coord, color in swapped_colors.items():
+            for window in self.coord_helper.get_sliding_windows_at(coord[0], coord[1]):
+                if all((swapped_colors[c] if c in swapped_colors else sprite_map[c[0]][c[1]].color) == color
+                        for c in window):
+                    return True
+        return False
+
+    def find_move_near(self, coords) -> tuple:
+        '''A valid swap of a cell up to 2 cells from one of coords, None if there is none'''
+        checked = set()
+        for x, y in coords:
+            for i in range(max(0, x - 2), min(self.dimension_x, x + 3)):
+                for j in range(max(0, y - 2), min(self.dimension_y, y + 3)):
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    for move in (((i, j), (i + 1, j)), ((i, j), (i, j + 1))):
+                        if self.coord_helper.is_valid_coordinate(*move[1]) and self.is_valid_swap(*move):
+                            return move
+        return None
+
+    def reshuffle_if_dead(self) -> bool:
+        if not self.is_dead_board():
+            return False
+        self.reshuffle_board()
+        return True
+
+    def reshuffle_board(self) -> None:
+        '''Shuffles the colors on the board until it has no match and at least one valid move'''
+        cells = self.get_color_cells()
+        if not self.move_finder.reshuffle(cells, self.rng, self.max_reshuffle_count):
+            # the color mix itself is hopeless, start over with a new board
+            self.init_cell_map()
+            if self.color_board is not None:
+                self.color_board.set_cells(
+                    [self.color_index[sprite.color] for column in self.sprite_map for sprite in column])
+            self.reshuffle_if_dead()
+            return
+        for x in range(self.dimension_x):
+            for y in range(self.dimension_y):
+                color = cells[self.move_finder.to_index(x, y)]
+                self.sprite_map[x][y].color = self.color_keys[color]
+        if self.color_board is not None:
+            self.color_board.set_cells(cells)
+
+    def start_game(self) -> None:
+        if self.input_recorder is not None:
+            self.input_recorder.record(self.tick_count, 'start')
+        self.game_status = GameStatus.Idle
+
     def set_selection(self, x: int, y: int) -> None:
+        if self.input_recorder is not None:
+            self.input_recorder.record(self.tick_count, 'select', x, y)
+        self.hint_coords = None
         if not self.coord_helper.is_valid_coordinate(x, y):
             self.selected_sprite_1 = None
             self.selected_sprite_2 = None
             return
         if self.selected_sprite_1 is None:
             self.selected_sprite_1 = self.sprite_map[x][y]
-            self.selected_sprite_1.show_sprite_info()
+            if self.verbose:
+                self.selected_sprite_1.show_sprite_info()
             return
 
         self.selected_sprite_2 = self.sprite_map[x][y]
-        self.selected_sprite_2.show_sprite_info()
+        if self.verbose:
+            self.selected_sprite_2.show_sprite_info()
         if not self.coord_helper.is_neighbor(self.selected_sprite_1, self.selected_sprite_2):
             self.selected_sprite_1 = None
             self.selected_sprite_2 = None
@@ -266,6 +483,8 @@ class GameManager:
         self.sprite_map[x2][y2].x = x2
         self.sprite_map[x2][y2].y = y2
         self.sprite_map[x2][y2].color = temp_color
+        if self.color_board is not None:
+            self.color_board.swap(coord1, coord2)
 
     def set_matched_highlight(self, sprite: ColorBlockSprite) -> None:
         matched_coords = self.get_matched_coordinates(sprite)
@@ -273,7 +492,9 @@ class GameManager:
             x = coord[0]
             y = coord[1]
             self.sprite_map[x][y].hilighted = True
+            self.highlighted_sprites.append(self.sprite_map[x][y])
         sprite.hilighted = True
+        self.highlighted_sprites.append(sprite)
 
     def get_matched_count(self, color: str, clear_coordinates: list) -> int:
         count = 0
@@ -299,6 +520,8 @@ class GameManager:
         return result
 
     def get_matched_coordinates(self, sprite: ColorBlockSprite) -> set:
+        if profiler.enabled:
+            profiler.count('get_matched_coordinates')
         results = set()
         sliding_windows = self.coord_helper.get_sliding_windows(sprite)
         for window in sliding_windows:
@@ -318,9 +541,15 @@ class GameManager:
     def clear_matched_blocks(self, sprites: list, is_new_turn: bool) -> None:
         combo = 0
         self.matched_coords = set()
-        for sprite in sprites:
-            for coord in self.get_matched_coordinates(sprite):
-                self.matched_coords.add(coord)
+        if self.color_board is not None:
+            self.matched_coords = self.color_board.get_dirty_matched_coordinates()
+            self.color_board.clear_dirty()
+        else:
+            for sprite in sprites:
+                for coord in self.get_matched_coordinates(sprite):
+                    self.matched_coords.add(coord)
+        if self.event_stream is not None:
+            self.event_stream.clear(self.matched_coords)
         matched_count = len(self.matched_coords)
         if matched_count > 0:
             combo += 1
@@ -328,34 +557,65 @@ class GameManager:
         self.clear_sprites(self.matched_coords)
 
     def clear_sprites(self, clear_coordinates: list) -> None:
+        self.cleared_columns = {}
         for coord in clear_coordinates:
             x = coord[0]
             y = coord[1]
             self.sprite_map[x][y].cleared = True
-        print(f'cleared{clear_coordinates}')
+            cleared_count, bottom = self.cleared_columns.get(x, (0, -1))
+            self.cleared_columns[x] = (cleared_count + 1, max(bottom, y))
+        self.highlighted_sprites = []
+        if self.color_board is not None:
+            self.color_board.clear(clear_coordinates)
+        if self.verbose:
+            print(f'cleared{clear_coordinates}')
 
     def set_drop_destination(self) -> None:
-        for column in self.sprite_map:
+        # only the new sprites and the sprites above the lowest cleared cell of a column move
+        self.dropping_sprites = []
+        for x in sorted(self.cleared_columns):
+            cleared_count, bottom = self.cleared_columns[x]
+            sprites = list(islice(self.sprite_map[x], cleared_count + bottom + 1))
             drop_distance = 0
-            for y in range(len(column) - 1, -1, -1):
-                sprite = column[y]
+            moves = []
+            for sprite in reversed(sprites):
                 if sprite.cleared:
                     drop_distance += 1
-                x = sprite.x
-                y = sprite.y + drop_distance
-                sprite.set_destination((x, y))
+                elif drop_distance > 0:
+                    moves.append((sprite.y, sprite.y + drop_distance))
+                sprite_x = sprite.x
+                sprite_y = sprite.y + drop_distance
+                sprite.set_destination((sprite_x, sprite_y))
+            self.dropping_sprites.extend(sprites)
+            if self.event_stream is not None:
+                self.event_stream.drop(x, moves)
 
     def remove_cleared_sprites(self) -> None:
-        for x in range(0, self.dimension_x):
-            cleared_count = sum(c.cleared for c in self.sprite_map[x])
-            if cleared_count > 0:
-                self.sprite_map[x] = list(filter(lambda x: (not x.cleared), self.sprite_map[x]))
+        self.changed_coords = set()
+        for x in sorted(self.cleared_columns):
+            cleared_count, bottom = self.cleared_columns[x]
+            column = self.sprite_map[x]
+            # new sprites are inserted on top, so the sprite previously at row y sits at cleared_count + y.
+            # rows below the lowest cleared cell stay as they are
+            sprites = [column.popleft() for _ in range(cleared_count + bottom + 1)]
+            kept_sprites = []
+            for sprite in sprites:
+                if sprite.cleared:
+                    self.sprite_pool.release(sprite)
+                else:
+                    kept_sprites.append(sprite)
+            column.extendleft(reversed(kept_sprites))
+            for y, sprite in enumerate(kept_sprites):
+                old_sprite = sprites[cleared_count + y]
+                if old_sprite.cleared or old_sprite.color != sprite.color:
+                    self.changed_coords.add((x, y))
+            if self.color_board is not None:
+                self.color_board.set_column(x, [self.color_index[s.color] for s in kept_sprites])
+        self.dropping_sprites = []
 
     def set_matched_sprite_alpha(self, frame_seed: int) -> None:
-        for column in self.sprite_map:
-            for sprite in column:
-                if sprite.hilighted:
-                    sprite.set_alpha(frame_seed)
+        for sprite in self.highlighted_sprites:
+            sprite.set_alpha(frame_seed)
 
     def get_sprite_by_coord(self, coord: tuple) -> ColorBlockSprite:
         # x = coord[0], y = coord[1]
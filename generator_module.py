@@ -0,0 +1,59 @@
+import random
+import threading
+from queue import Queue, Empty
+
+class BoardGenerator:
+    '''Generates match free boards of color indices, flattened column by column (index = x * dimension_y + y).
+    Cells are filled column by column, so only the two cells to the left and the two cells above
+    can already form a run with the new cell'''
+    def __init__(self, dimension_x: int, dimension_y: int, color_count: int) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+
+    def generate(self, rng: random.Random) -> list:
+        dimension_y = self.dimension_y
+        colors = range(self.color_count)
+        cells = [0] * (self.dimension_x * dimension_y)
+        for x in range(self.dimension_x):
+            for y in range(dimension_y):
+                index = x * dimension_y + y
+                left = -1
+                top = -1
+                if x >= 2 and cells[index - dimension_y] == cells[index - 2 * dimension_y]:
+                    left = cells[index - dimension_y]
+                if y >= 2 and cells[index - 1] == cells[index - 2]:
+                    top = cells[index - 1]
+                if left < 0 and top < 0:
+                    cells[index] = rng.randint(0, self.color_count - 1)
+                    continue
+                available_colors = [c for c in colors if c != left and c != top]
+                cells[index] = available_colors[rng.randint(0, len(available_colors) - 1)]
+        return cells
+
+class BoardPool:
+    '''Keeps a few generated boards ready in a background thread so starting a game takes no time.
+    Every board is generated from its own seed, so pooled games can still be recorded and replayed'''
+    def __init__(self, generator: BoardGenerator, size: int = 4) -> None:
+        self.generator = generator
+        self.boards = Queue(maxsize=size)
+        self.thread = threading.Thread(target=self.fill, daemon=True)
+        self.thread.start()
+
+    def fill(self) -> None:
+        while True:
+            self.boards.put(self.generate_board())
+
+    def generate_board(self) -> tuple:
+        '''(seed, cells, state of the seeded RNG right after generating the cells)'''
+        seed = random.randrange(2 ** 63)
+        rng = random.Random(seed)
+        cells = self.generator.generate(rng)
+        return (seed, cells, rng.getstate())
+
+    def get(self) -> tuple:
+        '''A ready board, or a freshly generated one if the pool has not caught up yet'''
+        try:
+            return self.boards.get_nowait()
+        except Empty:
+            return self.generate_board()
@@ -0,0 +1,217 @@
+'''Local leaderboard kept in SQLite. Finished sessions and the score of every turn are
+queued by the game and written in batches by a background thread.
+
+    python highscore_module.py [highscores.db] [-k 10] [--player name]
+'''
+import sqlite3
+import sys
+import threading
+import time
+from queue import Queue, Empty
+from game_manager import GameManager
+from score_module import ScoreInfo
+
+schema = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    dimension_x INTEGER NOT NULL,
+    dimension_y INTEGER NOT NULL,
+    total_score REAL NOT NULL,
+    max_combo INTEGER NOT NULL,
+    max_matched_count INTEGER NOT NULL,
+    turn_count INTEGER NOT NULL,
+    ended_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS turns (
+    session_id INTEGER NOT NULL,
+    turn INTEGER NOT NULL,
+    turn_score REAL NOT NULL,
+    turn_combo INTEGER NOT NULL,
+    turn_matched_count INTEGER NOT NULL,
+    PRIMARY KEY (session_id, turn)
+) WITHOUT ROWID;
+-- top_k and player_best read the first rows of these and stop
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (total_score DESC);
+CREATE INDEX IF NOT EXISTS sessions_by_player ON sessions (player, total_score DESC);
+'''
+session_columns = ('id', 'player', 'seed', 'dimension_x', 'dimension_y', 'total_score',
+    'max_combo', 'max_matched_count', 'turn_count', 'ended_at')
+insert_session = f'INSERT INTO sessions VALUES ({", ".join("?" * len(session_columns))})'
+insert_turn = 'INSERT INTO turns VALUES (?, ?, ?, ?, ?)'
+
+class HighScoreStore:
+    '''Writes go through a queue, so the frame loop never waits on the disk.
+    Queries use their own connection and see everything written before the last flush()'''
+    def __init__(self, path: str = 'highscores.db', batch_size: int = 256, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval # seconds a queued row may wait for its batch
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets the queries read while the writer thread commits
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(schema)
+        self.connection.commit()
+        # ids are handed out here, so turns can be queued before their session is finished.
+        # A game that was never finished leaves turns without a session, their id is taken too
+        self.next_session_id = self.connection.execute(
+            'SELECT MAX(COALESCE((SELECT MAX(id) FROM sessions), 0), COALESCE((SELECT MAX(session_id) FROM turns), 0)) + 1'
+        ).fetchone()[0]
+        self.id_lock = threading.Lock()
+        self.rows = Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self.write_rows, daemon=True)
+        self.thread.start()
+
+    def new_session_id(self) -> int:
+        with self.id_lock:
+            session_id = self.next_session_id
+            self.next_session_id += 1
+        return session_id
+
+    def add_turn(self, session_id: int, turn: int, score_info: ScoreInfo) -> None:
+        self.rows.put((insert_turn, (
+            session_id, turn, score_info.turn_score, score_info.turn_combo, score_info.turn_matched_count)))
+
+    def add_session(self,
+            session_id: int,
+            player: str,
+            gm: GameManager,
+            turn_count: int) -> None:
+        score_info = gm.get_score_info()
+        self.rows.put((insert_session, (
+            session_id, player, gm.seed, gm.dimension_x, gm.dimension_y, score_info.total_score,
+            score_info.max_combo, score_info.max_matched_count, turn_count, time.time())))
+
+    def write_rows(self) -> None:
+        # the writer has its own connection, sqlite connections are not shared between threads here
+        connection = sqlite3.connect(self.path)
+        # with WAL a crash can only lose the last batches, never corrupt the file
+        connection.execute('PRAGMA synchronous=NORMAL')
+        while True:
+            row = self.rows.get()
+            if row is None:
+                self.rows.task_done()
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.rows.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+                if row is None:
+                    # keep the sentinel for the outer loop after this batch is written
+                    self.rows.task_done()
+                    self.rows.put(None)
+                    break
+                batch.append(row)
+            try:
+                self.write_batch(connection, batch)
+            finally:
+                # flush() waits on these, a failed batch must not leave it hanging
+                for _ in batch:
+                    self.rows.task_done()
+        connection.close()
+
+    def write_batch(self, connection: sqlite3.Connection, batch: list) -> None:
+        # one transaction and one executemany per table
+        rows_by_statement = {}
+        for statement, values in batch:
+            rows_by_statement.setdefault(statement, []).append(values)
+        try:
+            with connection:
+                for statement, rows in rows_by_statement.items():
+                    connection.executemany(statement, rows)
+            return
+        except Exception as e:
+            print(f'high score batch of {len(batch)} rows failed, writing them one by one: {e}', file=sys.stderr)
+        # the failed transaction was rolled back, so only the bad rows are lost
+        for statement, values in batch:
+            try:
+                with connection:
+                    connection.execute(statement, values)
+            except Exception as e:
+                print(f'high score row {values} dropped: {e}', file=sys.stderr)
+
+    def flush(self) -> None:
+        '''Waits until every queued row is committed'''
+        self.rows.join()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.rows.put(None)
+        self.thread.join()
+        self.connection.close()
+
+    def query_sessions(self, sql: str, parameters: tuple) -> list:
+        cursor = self.connection.execute(sql, parameters)
+        return [dict(zip(session_columns, row)) for row in cursor]
+
+    def top_k(self, k: int = 10) -> list:
+        '''The k best sessions, best first'''
+        return self.query_sessions(
+            f'SELECT {", ".join(session_columns)} FROM sessions ORDER BY total_score DESC LIMIT ?', (k,))
+
+    def player_best(self, player: str) -> dict:
+        '''The best session of the player, None if they never finished one'''
+        sessions = self.query_sessions(
+            f'SELECT {", ".join(session_columns)} FROM sessions WHERE player = ? ORDER BY total_score DESC LIMIT 1',
+            (player,))
+        return sessions[0] if len(sessions) > 0 else None
+
+    def get_turns(self, session_id: int) -> list:
+        '''(turn, turn_score, turn_combo, turn_matched_count) of a session in order'''
+        return self.connection.execute(
+            'SELECT turn, turn_score, turn_combo, turn_matched_count FROM turns WHERE session_id = ? ORDER BY turn',
+            (session_id,)).fetchall()
+
+class ScoreRecorder:
+    '''Sends the scored turns of a GameManager to a HighScoreStore, finish() adds the session itself'''
+    def __init__(self, store: HighScoreStore, game_manager: GameManager, player: str) -> None:
+        self.store = store
+        self.game_manager = game_manager
+        self.player = player
+        self.session_id = store.new_session_id()
+        self.turn_count = 0
+        self.finished = False
+        game_manager.score_recorder = self
+
+    def turn_end(self, score_info: ScoreInfo) -> None:
+        self.turn_count += 1
+        self.store.add_turn(self.session_id, self.turn_count, score_info)
+
+    def finish(self) -> None:
+        '''Records the session once, games that never scored a turn are left out'''
+        if self.finished:
+            return
+        self.finished = True
+        if self.turn_count > 0:
+            self.store.add_session(self.session_id, self.player, self.game_manager, self.turn_count)
+
+if __name__ == '__main__':
+    path = 'highscores.db'
+    k = 10
+    player = None
+    args = sys.argv[1:]
+    while len(args) > 0:
+        arg = args.pop(0)
+        if arg == '-k':
+            k = int(args.pop(0))
+        elif arg == '--player':
+            player = args.pop(0)
+        else:
+            path = arg
+    store = HighScoreStore(path)
+    sessions = [store.player_best(player)] if player is not None else store.top_k(k)
+    for rank, session in enumerate(sessions, 1):
+        if session is None:
+            print(f'{player} has no finished sessions')
+            continue
+        print(f'{rank:>3} {session["player"]:<16} {int(session["total_score"]):>10} '
+            f'combo {session["max_combo"]:>3} matched {session["max_matched_count"]:>3} '
+            f'turns {session["turn_count"]:>4} {session["dimension_x"]}x{session["dimension_y"]}')
+    store.close()
@@ -0,0 +1,152 @@
+from coordinate_module import CoordinateHelper
+
+class MoveFinder:
+    '''Finds valid swaps on a board of color indices.
+    Boards are flat sequences indexed x * dimension_y + y, the same order as iterating GameManager.sprite_map.
+    The patterns are built from CoordinateHelper.sliding_windows as flat index offsets. A pattern only
+    reaches a few cells away, so cells at the same distance from every border share one pattern table
+    and a board of any size needs at most a few hundred of them'''
+    # only orthogonal neighbors are swapped, to the right and to the bottom of each cell
+    swap_directions = ((1, 0), (0, 1))
+    # how far a pattern reaches towards the start and the end of each axis
+    reach_before = 2
+    reach_after = 3
+    instances = {} # tables only depend on the board size, so finders are shared per size
+
+    @classmethod
+    def for_size(cls, dimension_x: int, dimension_y: int) -> 'MoveFinder':
+        key = (dimension_x, dimension_y)
+        if key not in cls.instances:
+            cls.instances[key] = cls(dimension_x, dimension_y)
+        return cls.instances[key]
+
+    def __init__(self, dimension_x: int, dimension_y: int) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.coord_helper = CoordinateHelper(dimension_x, dimension_y)
+        x_classes = [self.get_border_class(x, dimension_x) for x in range(dimension_x)]
+        y_classes = [self.get_border_class(y, dimension_y) for y in range(dimension_y)]
+        x_keys = sorted(set(x_classes))
+        y_keys = sorted(set(y_classes))
+        # per pattern class: swaps of the cell, windows containing it, runs starting at it
+        self.swap_patterns = []
+        self.window_patterns = []
+        self.run_patterns = []
+        for x_key in x_keys:
+            for y_key in y_keys:
+                self.add_patterns(x_classes.index(x_key), y_classes.index(y_key))
+        # pattern class of every cell, one byte each
+        y_ids = [y_keys.index(key) for key in y_classes]
+        self.cell_classes = bytearray()
+        for x in range(dimension_x):
+            base = x_keys.index(x_classes[x]) * len(y_keys)
+            self.cell_classes.extend(base + i for i in y_ids)
+
+    def get_border_class(self, position: int, length: int) -> tuple:
+        return (min(position, self.reach_before), min(length - 1 - position, self.reach_after))
+
+    def to_index(self, x: int, y: int) -> int:
+        return x * self.dimension_y + y
+
+    def to_coord(self, index: int) -> tuple:
+        return divmod(index, self.dimension_y)
+
+    def get_target_pairs(self, source: tuple, target: tuple) -> tuple:
+        '''Pairs of cells that complete a window when the color of source moves onto target'''
+        pairs = []
+        for window in CoordinateHelper.sliding_windows:
+            coords = [(target[0] + offset[0], target[1] + offset[1]) for offset in window]
+            if source in coords:
+                continue
+            if not all(self.coord_helper.is_valid_coordinate(x, y) for x, y in coords):
+                continue
+            pairs.append(tuple(self.to_index(x, y) for x, y in coords if (x, y) != target))
+        return tuple(pairs)
+
+    def add_patterns(self, x: int, y: int) -> None:
+        '''Appends the pattern tables of the class of cell (x, y), with indices relative to the cell'''
+        index = self.to_index(x, y)
+        def relative(indices: tuple) -> tuple:
+            return tuple(i - index for i in indices)
+
+        # (offset of the neighbor, pairs completed by the cell's color at the neighbor,
+        #  pairs completed by the neighbor's color at the cell)
+        swaps = []
+        for offset in self.swap_directions:
+            neighbor = (x + offset[0], y + offset[1])
+            if not self.coord_helper.is_valid_coordinate(neighbor[0], neighbor[1]):
+                continue
+            swaps.append((
+                self.to_index(neighbor[0], neighbor[1]) - index,
+                tuple(relative(pair) for pair in self.get_target_pairs((x, y), neighbor)),
+                tuple(relative(pair) for pair in self.get_target_pairs(neighbor, (x, y))),
+            ))
+        self.swap_patterns.append(tuple(swaps))
+
+        windows = []
+        for window in CoordinateHelper.sliding_windows:
+            coords = [(x + offset[0], y + offset[1]) for offset in window]
+            if all(self.coord_helper.is_valid_coordinate(i, j) for i, j in coords):
+                windows.append(relative(tuple(self.to_index(i, j) for i, j in coords)))
+        self.window_patterns.append(tuple(windows))
+
+        runs = []
+        if x + 2 < self.dimension_x:
+            runs.append((self.dimension_y, 2 * self.dimension_y))
+        if y + 2 < self.dimension_y:
+            runs.append((1, 2))
+        self.run_patterns.append(tuple(runs))
+
+    def iter_valid_moves(self, cells: list):
+        swap_patterns = self.swap_patterns
+        for index, pattern_class in enumerate(self.cell_classes):
+            color_1 = cells[index]
+            for offset, pairs_1, pairs_2 in swap_patterns[pattern_class]:
+                color_2 = cells[index + offset]
+                if color_1 == color_2:
+                    continue
+                if any(cells[index + a] == color_1 and cells[index + b] == color_1 for a, b in pairs_1) \
+                        or any(cells[index + a] == color_2 and cells[index + b] == color_2 for a, b in pairs_2):
+                    yield (self.to_coord(index), self.to_coord(index + offset))
+
+    def get_valid_moves(self, cells: list) -> list:
+        '''All valid swaps as pairs of (x, y) coordinates'''
+        return list(self.iter_valid_moves(cells))
+
+    def find_first_move(self, cells: list) -> tuple:
+        return next(self.iter_valid_moves(cells), None)
+
+    def has_valid_move(self, cells: list) -> bool:
+        return self.find_first_move(cells) is not None
+
+    def has_match(self, cells: list) -> bool:
+        run_patterns = self.run_patterns
+        for index, pattern_class in enumerate(self.cell_classes):
+            color = cells[index]
+            for b, c in run_patterns[pattern_class]:
+                if cells[index + b] == color and cells[index + c] == color:
+                    return True
+        return False
+
+    def get_matched_indices(self, cells: list, indices) -> set:
+        '''Cells of every run of 3 that touches one of the given cells'''
+        results = set()
+        window_patterns = self.window_patterns
+        cell_classes = self.cell_classes
+        for index in indices:
+            color = cells[index]
+            for a, b, c in window_patterns[cell_classes[index]]:
+                if cells[index + a] == color and cells[index + b] == color and cells[index + c] == color:
+                    results.add(index + a)
+                    results.add(index + b)
+                    results.add(index + c)
+        return results
+
+    def reshuffle(self, cells: list, rng, max_count: int) -> bool:
+        '''Shuffles cells in place until they have no match and a valid move.
+        Returns False if max_count shuffles were not enough'''
+        for _ in range(max_count):
+            rng.shuffle(cells)
+            if not self.has_match(cells) and self.has_valid_move(cells):
+                return True
+        return False
@@ -0,0 +1,64 @@
+import json
+import time
+
+class Profiler:
+    '''Opt-in timing histograms and counters for the hot paths.
+    Every hook first checks `enabled`, so a disabled profiler costs one attribute lookup'''
+    # upper bounds of the histogram buckets in microseconds, the last bucket takes the rest
+    bucket_bounds_us = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.timings = {}
+        self.counters = {}
+        self.started_at = time.perf_counter()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        elapsed_us = seconds * 1e6
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = {'count': 0, 'total_us': 0.0, 'max_us': 0.0, 'buckets': [0] * (len(self.bucket_bounds_us) + 1)}
+            self.timings[name] = timing
+        timing['count'] += 1
+        timing['total_us'] += elapsed_us
+        if timing['max_us'] < elapsed_us:
+            timing['max_us'] = elapsed_us
+        for i, bound in enumerate(self.bucket_bounds_us):
+            if elapsed_us <= bound:
+                timing['buckets'][i] += 1
+                break
+        else:
+            timing['buckets'][-1] += 1
+
+    def snapshot(self) -> dict:
+        timings = {}
+        for name, timing in self.timings.items():
+            timings[name] = dict(timing, mean_us=timing['total_us'] / timing['count'], buckets=list(timing['buckets']))
+        return {
+            'elapsed_s': time.perf_counter() - self.started_at,
+            'bucket_bounds_us': list(self.bucket_bounds_us),
+            'timings': timings,
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def get_summary_lines(self, limit: int = 10) -> list:
+        '''Short text lines for an on-screen overlay, slowest timings first'''
+        lines = []
+        by_total = sorted(self.timings.items(), key=lambda item: item[1]['total_us'], reverse=True)
+        for name, timing in by_total[:limit]:
+            lines.append(f'{name}: {timing["total_us"] / timing["count"]:.0f}us avg, {timing["max_us"]:.0f}us max')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name}: {value}')
+        return lines
+
+# shared by GameManager, SpritePool and game_app
+profiler = Profiler()
@@ -0,0 +1,127 @@
+import pygame
+from collections import OrderedDict
+
+class TextRenderer:
+    '''Draws HUD text with one Font per size and an LRU cache of rendered labels'''
+    def __init__(self, font_path: str, max_cache_bytes: int = 4 * 1024 * 1024) -> None:
+        self.font_path = font_path
+        self.max_cache_bytes = max_cache_bytes
+        self.fonts = {}
+        self.labels = OrderedDict() # (text, size, color) -> Surface, least recently used first
+        self.cache_bytes = 0
+
+    def get_font(self, size: int) -> pygame.font.Font:
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(self.font_path, size)
+            font.set_bold(True)
+            self.fonts[size] = font
+        return font
+
+    def get_label(self, text: str, size: int, color: tuple) -> pygame.Surface:
+        key = (text, size, color)
+        label = self.labels.get(key)
+        if label is not None:
+            self.labels.move_to_end(key)
+            return label
+        label = self.get_font(size).render(text, 1, color)
+        self.labels[key] = label
+        self.cache_bytes += self.get_surface_bytes(label)
+        while self.cache_bytes > self.max_cache_bytes and len(self.labels) > 1:
+            _, evicted = self.labels.popitem(last=False)
+            self.cache_bytes -= self.get_surface_bytes(evicted)
+        return label
+
+    def get_surface_bytes(self, surface: pygame.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def draw(self, screen: pygame.Surface, text: str, x: int, y: int, size: int, alpha: int, color: tuple = (0, 0, 0)) -> None:
+        label = self.get_label(text, size, color)
+        # the cached surface is shared, so its alpha is set again before every blit
+        label.set_alpha(alpha)
+        screen.blit(label, (x, y))
+
+class BlockAtlas:
+    '''Every (color, alpha) variant of the block images baked once into a single surface,
+    so drawing a block is an area lookup and a plain blit with no shared state to change'''
+    def __init__(self, images: dict, alphas: list) -> None:
+        alphas = sorted(set(alphas) | {255})
+        width, height = next(iter(images.values())).get_size()
+        self.surface = pygame.Surface((width * len(alphas), height * len(images)), pygame.SRCALPHA)
+        self.areas = {}
+        for row, (color, img) in enumerate(images.items()):
+            for column, alpha in enumerate(alphas):
+                variant = img.convert_alpha()
+                variant.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+                position = (column * width, row * height)
+                # adding onto the transparent atlas copies the pixels without blending them
+                self.surface.blit(variant, position, special_flags=pygame.BLEND_RGBA_ADD)
+                self.areas[(color, alpha)] = pygame.Rect(position, (width, height))
+
+    def get_area(self, color: str, alpha: int) -> pygame.Rect:
+        return self.areas[(color, alpha)]
+
+class DirtyRectRenderer:
+    '''Collects what a frame draws and repaints only the areas that differ from the previous frame.
+    flush() returns the changed rectangles for pygame.display.update()'''
+    max_dirty_rects = 32 # above this many, one bounding rectangle is cheaper to repaint
+
+    def __init__(self, screen: pygame.Surface, text_renderer: TextRenderer, background: tuple = (255, 255, 255)) -> None:
+        self.screen = screen
+        self.text_renderer = text_renderer
+        self.background = background
+        self.items = [] # (key, rect, surface, area, alpha, outline) in drawing order
+        self.previous_rects = {} # key -> rect of the last flushed frame
+        self.full_redraw = True
+
+    def invalidate(self) -> None:
+        '''Repaints the whole screen on the next flush'''
+        self.full_redraw = True
+
+    def add_surface(self, key: tuple, surface: pygame.Surface, x: float, y: float, alpha: int = 255) -> None:
+        '''key identifies the surface content, two items with the same key and position look the same'''
+        rect = surface.get_rect(topleft=(int(x), int(y)))
+        self.items.append(((key, alpha, rect.x, rect.y), rect, surface, None, alpha, None))
+
+    def add_atlas_block(self, atlas: BlockAtlas, color: str, alpha: int, x: float, y: float) -> None:
+        area = atlas.get_area(color, alpha)
+        rect = pygame.Rect((int(x), int(y)), area.size)
+        self.items.append((('block', color, alpha, rect.x, rect.y), rect, atlas.surface, area, None, None))
+
+    def add_text(self, text: str, x: float, y: float, size: int, alpha: int, color: tuple = (0, 0, 0)) -> None:
+        label = self.text_renderer.get_label(text, size, color)
+        self.add_surface(('text', text, size, color), label, x, y, alpha)
+
+    def add_outline(self, rect: tuple, color: tuple, width: int) -> None:
+        rect = pygame.Rect(rect)
+        self.items.append((('outline', color, width, tuple(rect)), rect, None, None, None, (color, width)))
+
+    def get_dirty_rects(self, current_rects: dict) -> list:
+        if self.full_redraw:
+            return [self.screen.get_rect()]
+        dirty_rects = [rect for key, rect in self.previous_rects.items() if key not in current_rects]
+        dirty_rects += [rect for key, rect in current_rects.items() if key not in self.previous_rects]
+        if len(dirty_rects) > self.max_dirty_rects:
+            dirty_rects = [dirty_rects[0].unionall(dirty_rects[1:])]
+        return dirty_rects
+
+    def flush(self) -> list:
+        current_rects = {item[0]: item[1] for item in self.items}
+        dirty_rects = self.get_dirty_rects(current_rects)
+        for dirty_rect in dirty_rects:
+            self.screen.set_clip(dirty_rect)
+            self.screen.fill(self.background, dirty_rect)
+            for _, rect, surface, area, alpha, outline in self.items:
+                if not dirty_rect.colliderect(rect):
+                    continue
+                if outline is not None:
+                    pygame.draw.rect(self.screen, outline[0], rect, outline[1])
+                    continue
+                if alpha is not None:
+                    surface.set_alpha(alpha)
+                self.screen.blit(surface, rect, area)
+        self.screen.set_clip(None)
+        self.previous_rects = current_rects
+        self.items = []
+        self.full_redraw = False
+        return dirty_rects
@@ -0,0 +1,92 @@
+'''Records the inputs of a game and replays them headlessly.
+
+    python replay_module.py session.json
+'''
+import json
+import sys
+import time
+from game_manager import GameManager
+from score_module import ScoreInfo
+
+score_fields = ('total_score', 'turn_score', 'turn_combo', 'turn_matched_count', 'max_combo', 'max_matched_count')
+
+def score_info_to_dict(score_info: ScoreInfo) -> dict:
+    return {field: getattr(score_info, field) for field in score_fields}
+
+class InputRecorder:
+    '''Logs the inputs given to a GameManager with the tick they arrived at.
+    The seed and the fixed logic step make the ticks reproducible'''
+    version = 1
+
+    def __init__(self, game_manager: GameManager, step: float) -> None:
+        self.game_manager = game_manager
+        self.step = step
+        self.events = [] # [tick, kind, *args]
+        game_manager.input_recorder = self
+
+    def record(self, tick: int, kind: str, *args) -> None:
+        self.events.append([tick, kind, *args])
+
+    def get_session(self) -> dict:
+        gm = self.game_manager
+        return {
+            'version': self.version,
+            'seed': gm.seed,
+            'dimension_x': gm.dimension_x,
+            'dimension_y': gm.dimension_y,
+            'step': self.step,
+            'events': self.events,
+            'final_tick': gm.tick_count,
+            'final_score': score_info_to_dict(gm.get_score_info()),
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.get_session(), f)
+
+def load_session(path: str) -> dict:
+    with open(path) as f:
+        session = json.load(f)
+    if session.get('version') != InputRecorder.version:
+        raise Exception(f'unsupported session version: {session.get("version")}')
+    return session
+
+def replay_session(session: dict) -> GameManager:
+    '''Re-runs the recorded inputs tick by tick without rendering and returns the final game'''
+    gm = GameManager(
+        verbose=False,
+        seed=session['seed'],
+        dimension_x=session['dimension_x'],
+        dimension_y=session['dimension_y'])
+    events = session['events']
+    step = session['step']
+    event_index = 0
+    for tick in range(session['final_tick'] + 1):
+        while event_index < len(events) and events[event_index][0] == tick:
+            kind = events[event_index][1]
+            if kind == 'start':
+                gm.start_game()
+            elif kind == 'select':
+                gm.set_selection(events[event_index][2], events[event_index][3])
+            else:
+                raise Exception(f'unrecognized session event: {kind}')
+            event_index += 1
+        if tick < session['final_tick']:
+            gm.process_frame(step)
+    return gm
+
+def verify_session(session: dict) -> bool:
+    '''True if replaying the session ends with the recorded ScoreInfo'''
+    gm = replay_session(session)
+    return score_info_to_dict(gm.get_score_info()) == session['final_score']
+
+if __name__ == '__main__':
+    session = load_session(sys.argv[1])
+    start = time.perf_counter()
+    gm = replay_session(session)
+    elapsed = time.perf_counter() - start
+    replayed_score = score_info_to_dict(gm.get_score_info())
+    print(f'replayed {session["final_tick"]} ticks in {elapsed * 1000:.1f}ms')
+    print(f'recorded: {session["final_score"]}')
+    print(f'replayed: {replayed_score}')
+    sys.exit(0 if replayed_score == session['final_score'] else 1)
@@ -0,0 +1,33 @@
+class FixedStepScheduler:
+    '''Turns elapsed display time into fixed logic steps.
+    The game logic always advances by the same step, however slow or fast the display runs'''
+    def __init__(self, step: float, max_steps: int = 10) -> None:
+        self.step = step
+        self.max_steps = max_steps # a long stall drops time instead of running a burst of steps
+        self.accumulator = 0.0
+
+    def advance(self, elapsed: float, update) -> float:
+        '''Calls update(step) for every full step in the elapsed seconds and
+        returns how far the display is between the last two steps (0 to 1)'''
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.step:
+            update(self.step)
+            self.accumulator -= self.step
+            steps += 1
+            if steps >= self.max_steps:
+                self.accumulator = 0.0
+                break
+        return self.accumulator / self.step
+
+    def catch_up(self, elapsed: float, update) -> float:
+        '''advance() without the max_steps limit, for time the caller slept through
+        on purpose while every step is cheap'''
+        self.accumulator += elapsed
+        while self.accumulator >= self.step:
+            update(self.step)
+            self.accumulator -= self.step
+        return self.accumulator / self.step
+
+    def reset(self) -> None:
+        self.accumulator = 0.0
@@ -1,16 +1,18 @@
 
 class ScoreInfo:
-    total_score = 0
-    turn_score = 0
-    turn_combo = 0
-    turn_matched_count = 0
-    max_combo = 0
-    max_matched_count = 0
+    __slots__ = ('total_score', 'turn_score', 'turn_combo', 'turn_matched_count', 'max_combo', 'max_matched_count')
+    def __init__(self) -> None:
+        self.total_score = 0
+        self.turn_score = 0
+        self.turn_combo = 0
+        self.turn_matched_count = 0
+        self.max_combo = 0
+        self.max_matched_count = 0
 
 class ScoreHelper:
-    score_info = ScoreInfo()
+    __slots__ = ('score_info',)
     def __init__(self) -> None:
-        pass
+        self.score_info = ScoreInfo() # every game counts its own score
 
     def add_score(self, matched_count: int, combo: int, reset_combo = True) -> None:
         if reset_combo:
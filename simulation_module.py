@@ -0,0 +1,79 @@
+import random
+import time
+from game_manager import GameManager
+from game_object import GameStatus
+from score_module import ScoreInfo
+
+class HeadlessGame:
+    '''Plays turns through GameManager's state machine without display, fonts or frame pacing'''
+    max_frames_per_turn = 100000
+
+    def __init__(self, game_manager: GameManager = None, step: float = 1.0, seed: int = None) -> None:
+        '''step is the time in seconds advanced per frame, long steps skip through
+        the animations without changing how the turn plays out.
+        seed drives the random moves of play_random_turn'''
+        if game_manager is None:
+            game_manager = GameManager(verbose=False)
+        self.game_manager = game_manager
+        self.step = step
+        self.rng = random.Random(seed)
+        self.game_manager.start_game() # same as pressing Enter in game_app
+        self.frame_count = 0
+        self.turn_count = 0
+
+    def play_turn(self, coord1: tuple, coord2: tuple) -> bool:
+        '''Selects both coordinates like two mouse clicks and runs the frames until the turn ends.
+        Returns True if the swap produced a match'''
+        gm = self.game_manager
+        # an off board first click would clear nothing and leave the second one selected for the next turn
+        if not all(gm.coord_helper.is_valid_coordinate(x, y) for x, y in (coord1, coord2)):
+            return False
+        gm.set_selection(coord1[0], coord1[1])
+        gm.set_selection(coord2[0], coord2[1])
+        if gm.game_status != GameStatus.SwapingForward:
+            return False
+
+        accepted = False
+        frames = 0
+        while gm.game_status != GameStatus.Idle:
+            gm.process_frame(self.step)
+            frames += 1
+            if gm.game_status == GameStatus.ShowingFirstMatched:
+                accepted = True
+            if frames > self.max_frames_per_turn:
+                raise Exception(f'turn did not finish in {frames} frames, status: {gm.game_status}')
+        self.frame_count += frames
+        self.turn_count += 1
+        return accepted
+
+    def play_random_turn(self) -> bool:
+        '''Swaps a random cell with its right or bottom neighbor'''
+        gm = self.game_manager
+        if self.rng.randint(0, 1) == 0:
+            x = self.rng.randint(0, gm.dimension_x - 2)
+            y = self.rng.randint(0, gm.dimension_y - 1)
+            return self.play_turn((x, y), (x + 1, y))
+        x = self.rng.randint(0, gm.dimension_x - 1)
+        y = self.rng.randint(0, gm.dimension_y - 2)
+        return self.play_turn((x, y), (x, y + 1))
+
+    def get_score_info(self) -> ScoreInfo:
+        return self.game_manager.get_score_info()
+
+def run_random_games(game_count: int, turn_count: int, seed: int = None) -> list:
+    '''Plays game_count games of turn_count random swaps each and returns their ScoreInfo'''
+    seed_rng = random.Random(seed)
+    results = []
+    for _ in range(game_count):
+        game = HeadlessGame(GameManager(verbose=False, seed=seed_rng.randrange(2 ** 63)), seed=seed_rng.randrange(2 ** 63))
+        for _ in range(turn_count):
+            game.play_random_turn()
+        results.append(game.get_score_info())
+    return results
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    scores = run_random_games(200, 20, seed=0)
+    elapsed = time.perf_counter() - start
+    average = sum(s.total_score for s in scores) / len(scores)
+    print(f'{len(scores)} games in {elapsed:.2f}s, average total score: {average:.1f}')
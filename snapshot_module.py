@@ -0,0 +1,117 @@
+'''Compact binary snapshots of a game between turns.
+
+    header: magic, version, dimension_x, dimension_y, color count, GameStatus, ScoreInfo fields
+    cells:  one color index byte per cell, column by column like MoveFinder uses
+'''
+import struct
+from game_manager import GameManager
+from game_object import GameStatus
+from replay_module import score_fields
+
+magic = b'M3SN'
+version = 1
+# little endian, field order follows replay_module.score_fields
+header_struct = struct.Struct('<4sBHHBBddIIII')
+# snapshots only hold the colors, so the sprites have to be at rest
+resting_statuses = (GameStatus.WaitingStart, GameStatus.Idle)
+
+def get_status_code(status: GameStatus) -> int:
+    # most GameStatus values are 1-tuples because of their trailing commas
+    return status.value[0] if isinstance(status.value, tuple) else status.value
+
+status_codes = {get_status_code(status): status for status in GameStatus}
+
+class Snapshot:
+    '''A parsed snapshot. cells is a memoryview into the buffer it was loaded from'''
+    def __init__(self,
+            dimension_x: int,
+            dimension_y: int,
+            color_count: int,
+            game_status: GameStatus,
+            score_values: tuple,
+            cells: memoryview) -> None:
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+        self.game_status = game_status
+        self.score_values = score_values
+        self.cells = cells
+
+def get_snapshot_size(dimension_x: int, dimension_y: int) -> int:
+    return header_struct.size + dimension_x * dimension_y
+
+def write_snapshot(gm: GameManager, buffer, offset: int = 0) -> int:
+    '''Packs the game into a writable buffer at offset, so checkpoints can reuse one buffer.
+    Returns the number of bytes written'''
+    if gm.game_status not in resting_statuses:
+        raise Exception(f'cannot snapshot a game in the middle of a turn: {gm.game_status}')
+    score_info = gm.get_score_info()
+    header_struct.pack_into(
+        buffer, offset,
+        magic, version, gm.dimension_x, gm.dimension_y, len(gm.color_keys), get_status_code(gm.game_status),
+        *(getattr(score_info, field) for field in score_fields))
+    start = offset + header_struct.size
+    end = start + gm.dimension_x * gm.dimension_y
+    memoryview(buffer)[start:end] = bytes(gm.get_color_cells())
+    return end - offset
+
+def dump_snapshot(gm: GameManager) -> bytes:
+    buffer = bytearray(get_snapshot_size(gm.dimension_x, gm.dimension_y))
+    write_snapshot(gm, buffer)
+    return bytes(buffer)
+
+def load_snapshot(data, offset: int = 0) -> Snapshot:
+    '''Parses the header, the cells are not copied'''
+    view = memoryview(data)
+    if len(view) - offset < header_struct.size:
+        raise Exception('snapshot is truncated')
+    fields = header_struct.unpack_from(view, offset)
+    if fields[0] != magic:
+        raise Exception('not a board snapshot')
+    if fields[1] != version:
+        raise Exception(f'unsupported snapshot version: {fields[1]}')
+    dimension_x, dimension_y, color_count, status_code = fields[2:6]
+    if status_code not in status_codes:
+        raise Exception(f'unrecognized game status code: {status_code}')
+    if status_codes[status_code] not in resting_statuses:
+        raise Exception(f'snapshot status is not a resting status: {status_codes[status_code]}')
+    start = offset + header_struct.size
+    cells = view[start:start + dimension_x * dimension_y]
+    if len(cells) != dimension_x * dimension_y:
+        raise Exception('snapshot is truncated')
+    return Snapshot(dimension_x, dimension_y, color_count, status_codes[status_code], fields[6:], cells)
+
+def restore_snapshot(gm: GameManager, data, offset: int = 0) -> None:
+    '''Puts a game of the same board size and colors back in the snapshot's state.
+    The existing sprites are recolored, nothing is allocated per cell.
+    Everything is checked before the game is touched, a bad snapshot leaves it as it was'''
+    snapshot = load_snapshot(data, offset)
+    if (snapshot.dimension_x, snapshot.dimension_y) != (gm.dimension_x, gm.dimension_y):
+        raise Exception(f'snapshot board size {snapshot.dimension_x}x{snapshot.dimension_y} '
+            f'does not match {gm.dimension_x}x{gm.dimension_y}')
+    if snapshot.color_count != len(gm.color_keys):
+        raise Exception(f'snapshot has {snapshot.color_count} colors, the game has {len(gm.color_keys)}')
+    cells = snapshot.cells
+    if len(cells) > 0 and max(cells) >= len(gm.color_keys):
+        raise Exception(f'snapshot cell color {max(cells)} is out of range for {len(gm.color_keys)} colors')
+
+    color_keys = gm.color_keys
+    dimension_y = gm.dimension_y
+    for x, column in enumerate(gm.sprite_map):
+        column_colors = cells[x * dimension_y:(x + 1) * dimension_y]
+        for y, sprite in enumerate(column):
+            sprite.color = color_keys[column_colors[y]]
+    if gm.color_board is not None:
+        gm.color_board.set_cells(cells)
+        gm.color_board.clear_dirty()
+
+    score_info = gm.get_score_info()
+    for field, value in zip(score_fields, snapshot.score_values):
+        setattr(score_info, field, value)
+    # the HUD draws the score sprite's ScoreInfo, which is the last turn's until the next set_score
+    gm.score_sprite.score_info = score_info
+    gm.selected_sprite_1 = None
+    gm.selected_sprite_2 = None
+    gm.hint_coords = None
+    gm.score_sprite.alpha = 0
+    gm.game_status = snapshot.game_status
@@ -0,0 +1,204 @@
+'''Move search by rolling out random future spawns, spread over a process pool.
+
+    python solver_module.py --strategy greedy --games 20 --turns 30
+'''
+import argparse
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from cascade_module import CascadeResolver
+from generator_module import BoardGenerator
+from move_module import MoveFinder
+
+resolvers = {} # one CascadeResolver per board shape, per process
+
+def get_resolver(dimension_x: int, dimension_y: int, color_count: int) -> CascadeResolver:
+    key = (dimension_x, dimension_y, color_count)
+    if key not in resolvers:
+        resolvers[key] = CascadeResolver(dimension_x, dimension_y, color_count)
+    return resolvers[key]
+
+def get_gain(resolver: CascadeResolver, cells: list, move: tuple, rng: random.Random) -> tuple:
+    '''(score of the turn, board after it) with spawns drawn from rng'''
+    result = resolver.resolve(cells, move[0], move[1], rng)
+    return result.score_info.total_score, result.cells
+
+def expectimax_value(resolver: CascadeResolver, cells: list, depth: int, samples: int, rng: random.Random) -> float:
+    '''Best expected score of the next depth turns, chance nodes estimated with samples rollouts'''
+    if depth <= 0:
+        return 0.0
+    best = 0.0
+    for move in resolver.move_finder.get_valid_moves(cells):
+        total = 0.0
+        for _ in range(samples):
+            gain, next_cells = get_gain(resolver, cells, move, rng)
+            total += gain + expectimax_value(resolver, next_cells, depth - 1, samples, rng)
+        best = max(best, total / samples)
+    return best
+
+def random_playout_value(resolver: CascadeResolver, cells: list, depth: int, rng: random.Random) -> float:
+    '''Score of depth random valid moves'''
+    total = 0.0
+    for _ in range(depth):
+        moves = resolver.move_finder.get_valid_moves(cells)
+        if not moves:
+            break
+        gain, cells = get_gain(resolver, cells, rng.choice(moves), rng)
+        total += gain
+    return total
+
+def evaluate_rollouts(task: tuple) -> list:
+    '''Values of the rollouts start to end of one move, runs in a worker process.
+    Rollout i draws from Random(seed + i), so its value does not depend on how the rollouts are split'''
+    dimension_x, dimension_y, color_count, cells, move, strategy, start, end, depth, seed = task
+    resolver = get_resolver(dimension_x, dimension_y, color_count)
+    values = []
+    for i in range(start, end):
+        rng = random.Random(seed + i)
+        gain, next_cells = get_gain(resolver, cells, move, rng)
+        if strategy == 'expectimax':
+            gain += expectimax_value(resolver, next_cells, depth - 1, 1, rng)
+        elif strategy == 'montecarlo':
+            gain += random_playout_value(resolver, next_cells, depth - 1, rng)
+        values.append(gain)
+    return values
+
+class MoveSolver:
+    '''Scores every valid swap by the mean score of its rollouts.
+    greedy only looks at the swap's own turn, expectimax adds the best follow-up moves
+    and montecarlo adds random follow-up moves, both up to depth turns in total'''
+    strategies = ('greedy', 'expectimax', 'montecarlo')
+
+    def __init__(self,
+            dimension_x: int,
+            dimension_y: int,
+            color_count: int,
+            strategy: str = 'greedy',
+            rollouts: int = 32,
+            depth: int = 2,
+            workers: int = None,
+            seed: int = None,
+            mp_context = None) -> None:
+        if strategy not in self.strategies:
+            raise Exception(f'unrecognized strategy: {strategy}')
+        self.dimension_x = dimension_x
+        self.dimension_y = dimension_y
+        self.color_count = color_count
+        self.strategy = strategy
+        self.rollouts = rollouts
+        self.depth = depth
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = random.Random(seed)
+        self.move_finder = MoveFinder.for_size(dimension_x, dimension_y)
+        self.executor = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context)
+        self.background = None
+
+    def start_workers(self) -> None:
+        '''Starts the worker processes right away instead of on the first move.
+        With the fork start method call it before any other thread exists: a forked child only
+        gets the calling thread and could wait forever on a lock another thread held'''
+        if self.executor is not None:
+            self.executor.submit(int).result()
+
+    def get_tasks(self, cells: list, move: tuple, seed: int) -> list:
+        '''Splits the rollouts of a move into one task per worker'''
+        tasks = []
+        chunk_count = min(self.workers, self.rollouts)
+        for i in range(chunk_count):
+            start = self.rollouts * i // chunk_count
+            end = self.rollouts * (i + 1) // chunk_count
+            tasks.append((
+                self.dimension_x, self.dimension_y, self.color_count,
+                cells, move, self.strategy, start, end, self.depth, seed))
+        return tasks
+
+    def evaluate_moves(self, cells: list) -> list:
+        '''(move, mean score) for every valid move, best first.
+        The same solver seed gives the same scores with any number of workers'''
+        moves = self.move_finder.get_valid_moves(cells)
+        # one draw per call and a block of seeds per move, so the seeds only depend on the move
+        seed = self.rng.randrange(2 ** 62)
+        tasks = []
+        for i, move in enumerate(moves):
+            tasks.extend(self.get_tasks(cells, move, seed + i * self.rollouts))
+        if self.executor is None:
+            values = list(map(evaluate_rollouts, tasks))
+        else:
+            values = list(self.executor.map(evaluate_rollouts, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))))
+        tasks_per_move = len(tasks) // len(moves) if moves else 0
+        scores = []
+        for i, move in enumerate(moves):
+            # summed rollout by rollout in order, so the floats add up the same however they were split
+            total = sum(value for task_values in values[i * tasks_per_move:(i + 1) * tasks_per_move] for value in task_values)
+            scores.append((move, total / self.rollouts))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def choose_move(self, cells: list) -> tuple:
+        '''The best valid move, None on a dead board'''
+        scores = self.evaluate_moves(cells)
+        if not scores:
+            return None
+        return scores[0][0]
+
+    def submit_choose_move(self, cells: list) -> Future:
+        '''choose_move on a background thread, so a frame loop can poll the result'''
+        if self.background is None:
+            self.background = ThreadPoolExecutor(max_workers=1)
+        return self.background.submit(self.choose_move, list(cells))
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        if self.background is not None:
+            self.background.shutdown(cancel_futures=True)
+
+def self_play(solver: MoveSolver, game_count: int, turn_count: int, seed: int = None) -> dict:
+    '''Plays games with the solver's moves and collects the statistics that
+    ScoreHelper.get_score_weight is balanced against'''
+    resolver = get_resolver(solver.dimension_x, solver.dimension_y, solver.color_count)
+    generator = BoardGenerator(solver.dimension_x, solver.dimension_y, solver.color_count)
+    seed_rng = random.Random(seed)
+    stats = {'total_scores': [], 'turn_combos': {}, 'wave_matched_counts': {}}
+    for _ in range(game_count):
+        rng = random.Random(seed_rng.randrange(2 ** 63))
+        cells = generator.generate(rng)
+        total_score = 0
+        for _ in range(turn_count):
+            move = solver.choose_move(cells)
+            if move is None:
+                break
+            result = resolver.resolve(cells, move[0], move[1], rng)
+            cells = result.cells
+            total_score += result.score_info.total_score
+            stats['turn_combos'][result.combo] = stats['turn_combos'].get(result.combo, 0) + 1
+            for wave in result.waves:
+                count = len(wave.cleared_coords)
+                stats['wave_matched_counts'][count] = stats['wave_matched_counts'].get(count, 0) + 1
+        stats['total_scores'].append(total_score)
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Self-play with the move solver')
+    parser.add_argument('--strategy', choices=MoveSolver.strategies, default='greedy')
+    parser.add_argument('--rollouts', type=int, default=32)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, nargs=2, default=[8, 8], metavar=('X', 'Y'), help='board dimensions')
+    args = parser.parse_args()
+
+    solver = MoveSolver(args.size[0], args.size[1], 6, args.strategy, args.rollouts, args.depth, args.workers, args.seed)
+    start = time.perf_counter()
+    stats = self_play(solver, args.games, args.turns, args.seed)
+    elapsed = time.perf_counter() - start
+    solver.shutdown()
+    scores = stats['total_scores']
+    print(f'{args.games} games in {elapsed:.1f}s, mean total score {sum(scores) / len(scores):.1f}')
+    print(f'turn combos: {dict(sorted(stats["turn_combos"].items()))}')
+    print(f'matched count per wave: {dict(sorted(stats["wave_matched_counts"].items()))}')
@@ -1,6 +1,8 @@
 from __future__ import annotations # to allow type hint of class itself
+import sys
 from score_module import ScoreInfo 
 from game_object import CellObject
+from profile_module import profiler
 
 alpha_table = [
     255, 213, 171, 129, 87, 45, 3, 0, 42, 84, 126, 168, 210, 252,
@@ -8,9 +10,10 @@ alpha_table = [
 ]
 
 class SpriteBase:
+    __slots__ = ('x', 'y', 'speed', 'direction', 'img', 'color', 'cleared')
     x: int
     y: int
-    speed: float
+    speed: float # per second
     direction: str # only 'up', 'down', 'left', 'right'
     img: str
     color: str
@@ -35,19 +38,21 @@ class SpriteBase:
     def set_direction(self, direction: str) -> None:
         direction = direction.lower()
         if direction in ['let', 'right', 'up', 'down']:
-            self.direction = direction
+            # lower() makes a new string, interning keeps one copy for every sprite
+            self.direction = sys.intern(direction)
     def set_speed(self, speed) -> None:
         if speed < 0:
             speed = speed * -1
         self.speed = speed
 
-    def process_frame(self) -> None:
+    def process_frame(self, dt: float) -> None:
         pass
 
 class ColorBlockSprite(SpriteBase):
-    destination: tuple = None # (x, y)
-    hilighted: bool = False
-    alpha: int = 255
+    __slots__ = ('destination', 'hilighted', 'alpha')
+    destination: tuple # (x, y)
+    hilighted: bool
+    alpha: int
     def __init__(self, x: int, y: int, speed: float, color:str) -> None:
         super().__init__(
             x,
@@ -57,6 +62,21 @@ class ColorBlockSprite(SpriteBase):
             '',
             color,
             False)
+        self.destination = None
+        self.hilighted = False
+        self.alpha = 255
+
+    def reset(self, x: int, y: int, speed: float, color: str) -> None:
+        '''Puts a recycled sprite back in the state of a newly created one'''
+        self.x = x
+        self.y = y
+        self.color = color
+        self.cleared = False
+        self.direction = 'down'
+        self.set_speed(speed)
+        self.destination = None
+        self.hilighted = False
+        self.alpha = 255
 
     def set_destination(self, dest: tuple) -> None:
         if dest[0] > self.x:
@@ -75,29 +95,45 @@ class ColorBlockSprite(SpriteBase):
     def set_alpha(self, frame_seed: int):
         self.alpha = alpha_table[frame_seed]
 
-    def move(self) -> None:
+    def move(self, dt: float) -> None:
         if self.reached_destination():
             return
+        distance = self.speed * dt
+        # landing exactly on the destination still snaps to it, so coordinates end up as ints
         if self.direction == 'left':
-            self.x -= self.speed
-            if self.x < self.destination[0]:
+            self.x -= distance
+            if self.x <= self.destination[0]:
                 self.x = self.destination[0]
         elif self.direction == 'right':
-            self.x += self.speed
-            if self.x > self.destination[0]:
+            self.x += distance
+            if self.x >= self.destination[0]:
                 self.x = self.destination[0]
         elif self.direction == 'up':
-            self.y -= self.speed
-            if self.y < self.destination[1]:
+            self.y -= distance
+            if self.y <= self.destination[1]:
                 self.y = self.destination[1]
         elif self.direction == 'down':
-            self.y += self.speed
-            if self.y > self.destination[1]:
+            self.y += distance
+            if self.y >= self.destination[1]:
                 self.y = self.destination[1]
         # print(f'moving: x={self.x}, y={self.y}')
 
-    def process_frame(self) -> None:
-        self.move()
+    def process_frame(self, dt: float) -> None:
+        self.move(dt)
+
+    def get_render_coord(self, blend: float, step: float) -> tuple:
+        '''Position between the previous logic step (blend = 0) and the current one (blend = 1).
+        A sprite that has not reached its destination moved a full step at constant speed'''
+        if self.destination is None or self.reached_destination():
+            return (self.x, self.y)
+        lag = self.speed * step * (1 - blend)
+        if self.direction == 'left':
+            return (self.x + lag, self.y)
+        if self.direction == 'right':
+            return (self.x - lag, self.y)
+        if self.direction == 'up':
+            return (self.x, self.y + lag)
+        return (self.x, self.y - lag)
 
     def reached_destination(self) -> bool:
         if self.destination is None:
@@ -125,8 +161,10 @@ class ColorBlockSprite(SpriteBase):
         return f'x={self.x}, y={self.y}, color={self.color}'
 
 class ScoreSprite(SpriteBase):
-    alpha: int = 0
-    score_info = ScoreInfo()
+    __slots__ = ('alpha', 'score_info')
+    alpha: float
+    fade_speed = 160 # alpha per second
+    score_info: ScoreInfo
     def __init__(self, x: int, y: int, speed: float, color: str = '') -> None:
         super().__init__(
             x,
@@ -136,6 +174,8 @@ class ScoreSprite(SpriteBase):
             '',
             color,
             False)
+        self.alpha = 0
+        self.score_info = ScoreInfo()
 
     def set_score(self, coordinate: tuple, score_info: ScoreInfo):
         x = coordinate[0]
@@ -148,10 +188,31 @@ class ScoreSprite(SpriteBase):
         self.score_info = score_info
         self.alpha = 255
 
-    def process_frame(self) -> None:
+    def process_frame(self, dt: float) -> None:
         if self.alpha == 0:
             return
             
-        self.alpha -= 4
+        self.alpha -= self.fade_speed * dt
         if self.alpha <= 100:
             self.alpha = 0
+
+class SpritePool:
+    '''Recycles cleared ColorBlockSprite objects instead of allocating new ones'''
+    def __init__(self) -> None:
+        self.free_sprites = []
+        self.allocated_count = 0
+
+    def acquire(self, x: int, y: int, speed: float, color: str) -> ColorBlockSprite:
+        if self.free_sprites:
+            if profiler.enabled:
+                profiler.count('sprite_reuse')
+            sprite = self.free_sprites.pop()
+            sprite.reset(x, y, speed, color)
+            return sprite
+        if profiler.enabled:
+            profiler.count('sprite_allocation')
+        self.allocated_count += 1
+        return ColorBlockSprite(x, y, speed, color)
+
+    def release(self, sprite: ColorBlockSprite) -> None:
+        self.free_sprites.append(sprite)
@@ -0,0 +1,46 @@
+import random
+import numpy as np
+from batch_module import BatchEngine, swap_directions
+from game_manager import GameManager
+from move_module import MoveFinder
+from replay_module import score_info_to_dict
+from simulation_module import HeadlessGame
+
+def test_move_mask_matches_move_finder():
+    for dimension_x, dimension_y in ((8, 8), (5, 9), (3, 3)):
+        engine = BatchEngine(30, dimension_x, dimension_y, 6, seeds=list(range(30)))
+        move_finder = MoveFinder.for_size(dimension_x, dimension_y)
+        move_mask = engine.get_move_mask()
+        for i in range(engine.count):
+            moves = {((x, y), (x + swap_directions[d][0], y + swap_directions[d][1]))
+                for d, x, y in zip(*np.nonzero(move_mask[i]))}
+            assert moves == set(move_finder.get_valid_moves(engine.cells[i].ravel().tolist()))
+
+def test_boards_play_like_games():
+    '''Board i steps exactly like GameManager(seed=seeds[i]), rejected and off board swaps included'''
+    count = 12
+    for dimension_x, dimension_y in ((8, 8), (6, 10), (4, 4)):
+        seeds = list(range(100, 100 + count))
+        engine = BatchEngine(count, dimension_x, dimension_y, 6, seeds=seeds)
+        games = [HeadlessGame(GameManager(verbose=False, seed=seed, dimension_x=dimension_x, dimension_y=dimension_y))
+            for seed in seeds]
+        rng = random.Random(dimension_x)
+        for _ in range(25):
+            moves = []
+            for game in games:
+                if rng.random() < 0.6:
+                    moves.append(rng.choice(game.game_manager.get_valid_moves()))
+                else:
+                    # neighbors that may not match, cells far apart, the same cell twice and cells off the board
+                    x = rng.randint(-1, dimension_x - 1)
+                    y = rng.randint(0, dimension_y - 1)
+                    moves.append(((x, y), (x + rng.choice([0, 1, 2]), y)))
+            before = [game.game_manager.get_score_info().total_score for game in games]
+            reward, accepted = engine.step([move[0] for move in moves], [move[1] for move in moves])
+            for i, game in enumerate(games):
+                gm = game.game_manager
+                assert accepted[i] == game.play_turn(*moves[i])
+                assert engine.cells[i].ravel().tolist() == gm.get_color_cells()
+                assert score_info_to_dict(engine.get_score_info(i)) == score_info_to_dict(gm.get_score_info())
+                assert reward[i] == gm.get_score_info().total_score - before[i]
+                assert engine.rngs[i].getstate() == gm.rng.getstate()
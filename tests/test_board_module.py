@@ -0,0 +1,41 @@
+import random
+import numpy as np
+from board_module import ArrayBoard
+from game_manager import GameManager
+from generator_module import BoardGenerator
+from replay_module import score_info_to_dict
+from simulation_module import HeadlessGame
+
+def test_dirty_matches_equal_full_scan():
+    '''Both the window check and the box mask find exactly the runs the changed cells made'''
+    for dimension_x, dimension_y in ((8, 8), (3, 12), (30, 20)):
+        generator = BoardGenerator(dimension_x, dimension_y, 6)
+        for seed in range(40):
+            rng = random.Random(seed)
+            cells = np.array(generator.generate(rng), dtype=np.int8).reshape(dimension_x, dimension_y)
+            board = ArrayBoard(dimension_x, dimension_y, cells)
+            # a small change uses the windows, a big one the mask
+            for change_count in (1, 3, ArrayBoard.dirty_window_limit + 5):
+                changed = board.copy()
+                x = rng.randrange(dimension_x)
+                for _ in range(change_count):
+                    y = rng.randrange(dimension_y)
+                    changed.set_column(x, changed.cells[x, :y + 1].tolist()[:-1] + [rng.randrange(6)])
+                    x = min(dimension_x - 1, max(0, x + rng.choice((-1, 0, 1))))
+                assert changed.get_dirty_matched_coordinates() == changed.get_matched_coordinates()
+                assert changed.get_window_matched_coordinates() == changed.get_matched_coordinates()
+                if len(changed.dirty) > 0:
+                    assert changed.get_box_matched_coordinates() == changed.get_matched_coordinates()
+
+def test_array_board_plays_like_sprites():
+    for size in (8, 20):
+        for seed in range(5):
+            games = [HeadlessGame(GameManager(verbose=False, seed=seed, use_array_board=use_array_board,
+                dimension_x=size, dimension_y=size), seed=seed) for use_array_board in (False, True)]
+            for _ in range(30):
+                for game in games:
+                    game.play_random_turn()
+            gm, array_gm = (game.game_manager for game in games)
+            assert array_gm.get_color_cells() == gm.get_color_cells()
+            assert array_gm.color_board.to_cells() == gm.get_color_cells()
+            assert score_info_to_dict(array_gm.get_score_info()) == score_info_to_dict(gm.get_score_info())
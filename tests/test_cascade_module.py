@@ -0,0 +1,43 @@
+import copy
+import random
+from cascade_module import CascadeResolver
+from game_manager import GameManager
+from replay_module import score_info_to_dict
+from score_module import ScoreHelper
+from simulation_module import HeadlessGame
+
+def test_resolve_matches_animated_game():
+    '''Given the same RNG state, resolve() ends where GameManager's animated turn ends'''
+    resolver = CascadeResolver(8, 8, len(GameManager.color_keys))
+    accepted_count = 0
+    for seed in range(20):
+        game = HeadlessGame(GameManager(verbose=False, seed=seed), seed=seed)
+        gm = game.game_manager
+        for _ in range(30):
+            if game.rng.random() < 0.7:
+                move = game.rng.choice(gm.get_valid_moves())
+            else:
+                x = game.rng.randint(0, 6)
+                y = game.rng.randint(0, 7)
+                move = ((x, y), (x + 1, y))
+            rng = random.Random()
+            rng.setstate(gm.rng.getstate())
+            score_helper = ScoreHelper()
+            score_helper.score_info = copy.copy(gm.score_helper.score_info)
+            result = resolver.resolve(gm.get_color_cells(), move[0], move[1], rng, score_helper)
+            accepted = game.play_turn(move[0], move[1])
+            assert result.accepted == accepted
+            assert result.cells == gm.get_color_cells()
+            assert rng.getstate() == gm.rng.getstate()
+            assert score_info_to_dict(result.score_info) == score_info_to_dict(gm.get_score_info())
+            accepted_count += accepted
+    assert accepted_count > 0
+
+def test_rejected_swaps_leave_board_unchanged():
+    resolver = CascadeResolver(8, 8, len(GameManager.color_keys))
+    gm = GameManager(verbose=False, seed=3)
+    cells = gm.get_color_cells()
+    for move in (((0, 0), (2, 0)), ((0, 0), (1, 1)), ((-1, 0), (0, 0))):
+        result = resolver.resolve(cells, move[0], move[1], random.Random(0))
+        assert not result.accepted
+        assert result.cells == cells
@@ -0,0 +1,64 @@
+import pytest
+from coordinate_module import CoordinateHelper
+from game_manager import GameManager
+from game_object import CellObject
+from replay_module import score_info_to_dict
+from simulation_module import HeadlessGame
+
+class OffsetHelper(CoordinateHelper):
+    '''Works every answer out from the offsets on each call, like before the tables'''
+    def get_clear_coordinates(self, cell) -> tuple:
+        return tuple((cell.x + i, cell.y + j)
+            for i, j in self.clearing_offsets if self.is_valid_coordinate(cell.x + i, cell.y + j))
+
+    def get_clear_coordinates_dict(self, sprite) -> dict:
+        result = {}
+        for key, offsets in self.clearing_directions:
+            dir_coords = tuple((sprite.x + i, sprite.y + j) for i, j in offsets)
+            if all(self.is_valid_coordinate(x, y) for x, y in dir_coords):
+                result[key] = dir_coords
+        return result
+
+    def get_sliding_windows(self, sprite) -> tuple:
+        return tuple(
+            window for window in (tuple((sprite.x + i, sprite.y + j) for i, j in offsets)
+                for offsets in self.sliding_windows)
+            if all(self.is_valid_coordinate(x, y) for x, y in window))
+
+def check_cells(dimension_x: int, dimension_y: int, coords) -> None:
+    helper = CoordinateHelper(dimension_x, dimension_y)
+    offset_helper = OffsetHelper(dimension_x, dimension_y)
+    for x, y in coords:
+        cell = CellObject(x, y, '')
+        assert helper.get_clear_coordinates(cell) == offset_helper.get_clear_coordinates(cell)
+        assert dict(helper.get_clear_coordinates_dict(cell)) == offset_helper.get_clear_coordinates_dict(cell)
+        assert helper.get_sliding_windows(cell) == offset_helper.get_sliding_windows(cell)
+
+def test_tables_match_offsets():
+    for dimension_x, dimension_y in ((8, 8), (1, 1), (2, 7), (5, 3), (12, 9)):
+        check_cells(dimension_x, dimension_y,
+            [(x, y) for x in range(dimension_x) for y in range(dimension_y)])
+    # past eager_cell_limit the cells are filled on first use
+    check_cells(80, 70, [(0, 0), (1, 69), (40, 35), (79, 68), (78, 0), (40, 35)])
+
+def test_tables_are_shared_and_read_only():
+    helper = CoordinateHelper(8, 8)
+    assert CoordinateHelper(8, 8).clear_dict_table is helper.clear_dict_table
+    clear_dict = helper.get_clear_coordinates_dict(CellObject(3, 4, ''))
+    with pytest.raises(TypeError):
+        clear_dict['left'] = ((0, 0), (0, 1))
+    with pytest.raises(TypeError):
+        del clear_dict['up']
+    assert helper.get_clear_coordinates_dict(CellObject(3, 4, ''))['left'] == ((2, 4), (1, 4))
+
+def test_games_play_the_same_with_offsets():
+    for seed in range(10):
+        games = [HeadlessGame(GameManager(verbose=False, seed=seed), seed=seed) for _ in range(2)]
+        offset_gm = games[1].game_manager
+        offset_gm.coord_helper = OffsetHelper(offset_gm.dimension_x, offset_gm.dimension_y)
+        for _ in range(30):
+            for game in games:
+                game.play_random_turn()
+            assert games[0].game_manager.get_color_cells() == offset_gm.get_color_cells()
+        assert score_info_to_dict(games[0].game_manager.get_score_info()) == \
+            score_info_to_dict(offset_gm.get_score_info())
@@ -0,0 +1,79 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from env_module import MatchEnv, SubprocessVectorEnv, decode_actions
+from game_manager import GameManager
+from replay_module import score_info_to_dict
+from simulation_module import HeadlessGame
+
+def test_observation_is_a_view():
+    env = MatchEnv(max_turns=30)
+    observation, _ = env.reset(seed=7)
+    assert np.shares_memory(observation, env.engine.cells)
+    game = HeadlessGame(GameManager(verbose=False, seed=7))
+    rng = np.random.default_rng(1)
+    total_reward = 0
+    for _ in range(30):
+        if rng.random() < 0.8:
+            action = rng.choice(np.flatnonzero(env.get_action_mask()))
+        else:
+            action = rng.integers(env.action_count)
+        coords_1, coords_2 = decode_actions(action, env.dimension_x, env.dimension_y)
+        next_observation, reward, terminated, truncated, info = env.step(action)
+        # the same array, updated in place
+        assert next_observation is observation
+        assert info['accepted'] == game.play_turn(tuple(coords_1[0]), tuple(coords_2[0]))
+        assert observation.ravel().tolist() == game.game_manager.get_color_cells()
+        total_reward += reward
+    assert truncated and not terminated
+    assert total_reward == game.game_manager.get_score_info().total_score
+    assert score_info_to_dict(env.get_score_info()) == score_info_to_dict(game.game_manager.get_score_info())
+    with pytest.raises(Exception, match='out of range'):
+        env.step(-1)
+
+@pytest.mark.parametrize('method', [method for method in ('fork', 'spawn') if method in multiprocessing.get_all_start_methods()])
+def test_vector_env_matches_single_envs(method):
+    env_count = 7
+    max_turns = 12
+    vector_env = SubprocessVectorEnv(env_count, max_turns=max_turns, workers=3,
+        mp_context=multiprocessing.get_context(method))
+    try:
+        seeds = list(range(env_count))
+        observations, info = vector_env.reset(seeds=seeds)
+        assert info['seeds'] == seeds
+        envs = [MatchEnv(max_turns=max_turns) for _ in seeds]
+        for env, seed in zip(envs, seeds):
+            env.reset(seed=seed)
+        rng = np.random.default_rng(0)
+        for turn in range(max_turns):
+            assert (observations == np.stack([env.observation for env in envs])).all()
+            masks = vector_env.get_action_masks()
+            assert (masks == np.stack([env.get_action_mask() for env in envs])).all()
+            # mostly matching swaps, some that are rejected
+            actions = np.array([rng.choice(np.flatnonzero(mask)) if rng.random() < 0.8
+                else rng.integers(vector_env.action_count) for mask in masks])
+            next_observations, rewards, terminated, truncated, info = vector_env.step(actions)
+            assert next_observations is observations
+            results = [env.step(action) for env, action in zip(envs, actions)]
+            assert (rewards == [result[1] for result in results]).all()
+            assert (info['accepted'] == [result[4]['accepted'] for result in results]).all()
+            assert (truncated == [result[3] for result in results]).all()
+            assert not terminated.any()
+        # the last step truncated every episode and started new boards
+        assert truncated.all()
+        assert not (observations == np.stack([env.observation for env in envs])).all()
+    finally:
+        vector_env.close()
+
+def test_close_releases_shared_memory():
+    vector_env = SubprocessVectorEnv(4, workers=2, mp_context=multiprocessing.get_context())
+    names = [block.name for block in vector_env.blocks.values()]
+    vector_env.step(np.zeros(4, dtype=np.int64))
+    vector_env.close()
+    assert vector_env.observations is None
+    assert all(not process.is_alive() for process in vector_env.processes)
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    vector_env.close() # closing twice is fine
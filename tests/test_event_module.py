@@ -0,0 +1,34 @@
+from event_module import RESHUFFLE, TurnEventStream, apply_events, decode_events, read_varint, unzigzag, \
+    write_varint, zigzag
+from game_manager import GameManager
+from simulation_module import HeadlessGame
+
+def test_varint_round_trip():
+    for value in (0, 1, 127, 128, 300, 2 ** 35, -1, -64, -2 ** 40):
+        buffer = bytearray()
+        write_varint(buffer, zigzag(value))
+        encoded, position = read_varint(buffer, 0)
+        assert position == len(buffer)
+        assert unzigzag(encoded) == value
+
+def test_client_follows_game():
+    '''A client applying the decoded events ends every turn on the game's board and score'''
+    reshuffle_count = 0
+    for dimension_x, dimension_y in ((8, 8), (4, 4), (6, 9)):
+        for seed in range(8):
+            gm = GameManager(verbose=False, seed=seed, dimension_x=dimension_x, dimension_y=dimension_y)
+            stream = TurnEventStream(gm)
+            # short steps land the frames in the middle of the animations, long ones skip them
+            game = HeadlessGame(gm, step=0.025 if seed % 2 else 1.0, seed=seed)
+            cells = gm.get_color_cells()
+            score = 0
+            for _ in range(20):
+                game.play_random_turn()
+                for data in stream.take_turns():
+                    events = decode_events(data, dimension_x, dimension_y)
+                    reshuffle_count += sum(event[0] == RESHUFFLE for event in events)
+                    score += apply_events(cells, events, dimension_y)
+                assert cells == gm.get_color_cells()
+                assert score == round(gm.get_score_info().total_score)
+    # the 4x4 boards run out of moves, so reshuffles are covered too
+    assert reshuffle_count > 0
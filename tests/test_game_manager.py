@@ -0,0 +1,52 @@
+import random
+from game_manager import GameManager
+from generator_module import BoardGenerator
+from simulation_module import HeadlessGame
+
+def set_colors(gm: GameManager, cells: list) -> None:
+    for x, column in enumerate(gm.sprite_map):
+        for y, sprite in enumerate(column):
+            sprite.color = gm.color_keys[cells[x * gm.dimension_y + y]]
+
+def test_dead_board_check_matches_full_scan():
+    dead_count = 0
+    for size in (4, 5, 8):
+        generator = BoardGenerator(size, size, len(GameManager.color_keys))
+        rng = random.Random(size)
+        for seed in range(10):
+            game = HeadlessGame(GameManager(verbose=False, seed=seed, dimension_x=size, dimension_y=size), seed=seed)
+            gm = game.game_manager
+            for _ in range(10):
+                game.play_random_turn()
+                assert gm.is_dead_board() == (not gm.move_finder.has_valid_move(gm.get_color_cells()))
+                assert gm.known_move in gm.get_valid_moves()
+                # a new board behind the game's back, the known move may no longer be valid
+                cells = generator.generate(rng)
+                set_colors(gm, cells)
+                assert gm.is_dead_board() == (not gm.move_finder.has_valid_move(cells))
+                if gm.reshuffle_if_dead():
+                    assert gm.move_finder.has_valid_move(gm.get_color_cells())
+                    dead_count += 1
+    # the small boards are often generated without a move
+    assert dead_count > 0
+
+def test_games_keep_their_own_state():
+    played = HeadlessGame(GameManager(verbose=False, seed=1), seed=1)
+    other = GameManager(verbose=False, seed=2)
+    for _ in range(15):
+        played.play_turn(*played.game_manager.get_valid_moves()[0])
+    gm = played.game_manager
+    assert gm.get_score_info().total_score > 0
+    assert other.get_score_info().total_score == 0
+    assert other.score_sprite.score_info.total_score == 0
+    assert gm.score_helper is not other.score_helper
+    assert gm.score_sprite is not other.score_sprite
+    sprites = {id(sprite) for column in gm.sprite_map for sprite in column}
+    assert not sprites & {id(sprite) for column in other.sprite_map for sprite in column}
+    assert gm.sprite_pool is not other.sprite_pool
+    # a game started after another one has played starts from nothing
+    new = GameManager(verbose=False, seed=1)
+    assert new.get_score_info().total_score == 0
+    assert new.get_score_info().max_combo == 0
+    assert new.score_sprite.score_info.total_score == 0
+    assert new.get_color_cells() == GameManager(verbose=False, seed=1).get_color_cells()
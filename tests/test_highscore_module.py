@@ -0,0 +1,86 @@
+import threading
+import time
+from game_manager import GameManager
+from highscore_module import HighScoreStore, ScoreRecorder, insert_turn
+from score_module import ScoreInfo
+from simulation_module import HeadlessGame
+
+def flush(store: HighScoreStore) -> None:
+    '''store.flush() that fails the test instead of hanging it'''
+    thread = threading.Thread(target=store.flush, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), 'flush did not return'
+
+def play(store: HighScoreStore, player: str, seed: int, turn_count: int, finish: bool = True) -> ScoreRecorder:
+    game = HeadlessGame(GameManager(verbose=False, seed=seed), seed=seed)
+    recorder = ScoreRecorder(store, game.game_manager, player)
+    for _ in range(turn_count):
+        game.play_turn(*game.game_manager.get_valid_moves()[0])
+    if finish:
+        recorder.finish()
+    return recorder
+
+def test_full_batches_are_written_without_waiting(tmp_path):
+    store = HighScoreStore(str(tmp_path / 'highscores.db'), batch_size=4, flush_interval=60)
+    score_info = ScoreInfo()
+    for turn in range(4):
+        store.add_turn(1, turn, score_info)
+    deadline = time.monotonic() + 10
+    while len(store.get_turns(1)) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(store.get_turns(1)) == 4
+    # a batch that never fills is written when the store closes
+    store.add_turn(1, 4, score_info)
+    store.close()
+    assert len(HighScoreStore(str(tmp_path / 'highscores.db')).get_turns(1)) == 5
+
+def test_top_k_and_player_best(tmp_path):
+    store = HighScoreStore(str(tmp_path / 'highscores.db'), batch_size=3, flush_interval=0.01)
+    recorders = [play(store, player, seed, turn_count)
+        for player, seed, turn_count in (('ann', 1, 10), ('bob', 2, 3), ('ann', 3, 1), ('bob', 4, 6))]
+    # a game without a scored turn is not a session
+    play(store, 'cat', 5, 0)
+    flush(store)
+    sessions = store.top_k(10)
+    scores = [recorder.game_manager.get_score_info().total_score for recorder in recorders]
+    assert [session['total_score'] for session in sessions] == sorted(scores, reverse=True)
+    assert [session['total_score'] for session in store.top_k(2)] == sorted(scores, reverse=True)[:2]
+    for player in ('ann', 'bob'):
+        best = max(score for recorder, score in zip(recorders, scores) if recorder.player == player)
+        assert store.player_best(player)['total_score'] == best
+    assert store.player_best('cat') is None
+    assert len(store.get_turns(recorders[0].session_id)) == recorders[0].turn_count
+    store.close()
+
+def test_unfinished_session_does_not_block_the_next_launch(tmp_path):
+    path = str(tmp_path / 'highscores.db')
+    store = HighScoreStore(path)
+    play(store, 'ann', 1, 4)
+    # killed before the game finished: its turns are written, its session never is
+    unfinished = play(store, 'ann', 2, 5, finish=False)
+    store.close()
+    store = HighScoreStore(path, flush_interval=0.01)
+    recorder = play(store, 'ann', 3, 6)
+    assert recorder.session_id > unfinished.session_id
+    flush(store)
+    assert len(store.get_turns(recorder.session_id)) == 6
+    assert len(store.get_turns(unfinished.session_id)) == 5
+    assert len(store.top_k(10)) == 2
+    store.close()
+
+def test_bad_row_does_not_stop_the_writer(tmp_path):
+    store = HighScoreStore(str(tmp_path / 'highscores.db'), batch_size=10, flush_interval=0.01)
+    score_info = ScoreInfo()
+    session_id = store.new_session_id()
+    store.add_turn(session_id, 1, score_info)
+    flush(store)
+    # the same turn again breaks the primary key, the rest of its batch still lands
+    store.rows.put((insert_turn, (session_id, 1, 0.0, 0, 0)))
+    store.add_turn(session_id, 2, score_info)
+    flush(store)
+    recorder = play(store, 'ann', 1, 3)
+    flush(store)
+    assert [turn[0] for turn in store.get_turns(session_id)] == [1, 2]
+    assert store.player_best('ann')['id'] == recorder.session_id
+    store.close()
@@ -0,0 +1,50 @@
+import random
+from move_module import MoveFinder
+
+def get_runs(cells: list, dimension_x: int, dimension_y: int) -> set:
+    '''Cells of every horizontal or vertical run of 3, by scanning the whole board'''
+    results = set()
+    for x in range(dimension_x):
+        for y in range(dimension_y):
+            for i, j in ((1, 0), (0, 1)):
+                if x + 2 * i < dimension_x and y + 2 * j < dimension_y:
+                    run = [(x + k * i) * dimension_y + y + k * j for k in range(3)]
+                    if cells[run[0]] == cells[run[1]] == cells[run[2]]:
+                        results.update(run)
+    return results
+
+def get_swap_moves(cells: list, dimension_x: int, dimension_y: int) -> list:
+    '''Every swap with the right or bottom neighbor that puts one of the two cells in a run'''
+    moves = []
+    for x in range(dimension_x):
+        for y in range(dimension_y):
+            for i, j in MoveFinder.swap_directions:
+                if x + i >= dimension_x or y + j >= dimension_y:
+                    continue
+                index_1 = x * dimension_y + y
+                index_2 = (x + i) * dimension_y + y + j
+                if cells[index_1] == cells[index_2]:
+                    continue
+                swapped = list(cells)
+                swapped[index_1], swapped[index_2] = swapped[index_2], swapped[index_1]
+                runs = get_runs(swapped, dimension_x, dimension_y)
+                if index_1 in runs or index_2 in runs:
+                    moves.append(((x, y), (x + i, y + j)))
+    return moves
+
+def test_moves_match_swap_and_scan():
+    rng = random.Random(0)
+    sizes = [(x, y) for x in range(1, 8) for y in range(1, 8)] + [(1, 12), (12, 1), (9, 11)]
+    for dimension_x, dimension_y in sizes:
+        move_finder = MoveFinder.for_size(dimension_x, dimension_y)
+        for _ in range(40):
+            # few colors make runs and valid moves common, many make dead boards common
+            color_count = rng.choice((2, 3, 4, 6))
+            cells = [rng.randrange(color_count) for _ in range(dimension_x * dimension_y)]
+            moves = get_swap_moves(cells, dimension_x, dimension_y)
+            runs = get_runs(cells, dimension_x, dimension_y)
+            assert sorted(move_finder.get_valid_moves(cells)) == sorted(moves)
+            assert move_finder.has_valid_move(cells) == (len(moves) > 0)
+            assert move_finder.find_first_move(cells) in (moves or [None])
+            assert move_finder.has_match(cells) == (len(runs) > 0)
+            assert move_finder.get_matched_indices(cells, range(len(cells))) == runs
@@ -0,0 +1,35 @@
+import json
+from game_manager import GameManager
+from profile_module import Profiler, profiler
+from simulation_module import HeadlessGame
+
+def test_timings_and_counters():
+    timings = Profiler()
+    for seconds in (5e-6, 15e-6, 15e-6, 0.2):
+        timings.add_timing('frame', seconds)
+    timings.count('has_match')
+    timings.count('has_match', 2)
+    frame = timings.snapshot()['timings']['frame']
+    assert frame['count'] == 4
+    assert frame['buckets'][:2] == [1, 2]
+    assert frame['buckets'][-1] == 1
+    assert abs(frame['max_us'] - 2e5) < 1e-6
+    assert abs(frame['mean_us'] - (5 + 15 + 15 + 2e5) / 4) < 1e-6
+    assert json.loads(timings.to_json())['counters'] == {'has_match': 3}
+    assert timings.get_summary_lines()[0].startswith('frame:')
+    timings.reset()
+    assert timings.snapshot()['timings'] == {} and timings.snapshot()['counters'] == {}
+
+def test_game_hooks_only_count_when_enabled():
+    profiler.reset()
+    game = HeadlessGame(GameManager(verbose=False, seed=3), seed=3)
+    game.play_random_turn()
+    assert profiler.snapshot()['counters'] == {}
+    profiler.enabled = True
+    try:
+        for _ in range(5):
+            game.play_random_turn()
+    finally:
+        profiler.enabled = False
+    assert profiler.snapshot()['counters'].get('has_match', 0) > 0
+    profiler.reset()
@@ -0,0 +1,23 @@
+import os
+import pygame
+from render_module import TextRenderer
+
+def test_label_cache_is_least_recently_used():
+    pygame.font.init()
+    # the font that ships with pygame, the game's own font is not in the repository
+    font_path = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+    renderer = TextRenderer(font_path)
+    first = renderer.get_label('123', 20, (0, 0, 0))
+    assert renderer.get_label('123', 20, (0, 0, 0)) is first
+    assert renderer.get_label('123', 24, (0, 0, 0)) is not first
+    label_bytes = renderer.get_surface_bytes(first)
+    # room for about two labels the size of the first one
+    renderer = TextRenderer(font_path, max_cache_bytes=label_bytes * 2 + label_bytes // 2)
+    a = renderer.get_label('123', 20, (0, 0, 0))
+    b = renderer.get_label('456', 20, (0, 0, 0))
+    assert renderer.get_label('123', 20, (0, 0, 0)) is a # now the most recently used
+    renderer.get_label('789', 20, (0, 0, 0))
+    assert list(renderer.labels) == [('123', 20, (0, 0, 0)), ('789', 20, (0, 0, 0))]
+    assert renderer.get_label('456', 20, (0, 0, 0)) is not b
+    assert renderer.cache_bytes == sum(map(renderer.get_surface_bytes, renderer.labels.values()))
+    assert renderer.cache_bytes <= renderer.max_cache_bytes
@@ -0,0 +1,36 @@
+from game_manager import GameManager
+from generator_module import BoardGenerator, BoardPool
+from replay_module import InputRecorder, load_session, replay_session, score_info_to_dict, verify_session
+from simulation_module import HeadlessGame
+
+def record_game(gm: GameManager, step: float, turn_count: int, seed: int) -> InputRecorder:
+    recorder = InputRecorder(gm, step)
+    game = HeadlessGame(gm, step=step, seed=seed)
+    for _ in range(turn_count):
+        if game.rng.random() < 0.5:
+            game.play_turn(*game.rng.choice(gm.get_valid_moves()))
+        else:
+            game.play_random_turn()
+    return recorder
+
+def test_recorded_session_replays(tmp_path):
+    pool = BoardPool(BoardGenerator(GameManager.dimension_x, GameManager.dimension_y, len(GameManager.color_keys)))
+    games = [GameManager(verbose=False, seed=seed) for seed in range(3)]
+    games += [GameManager(verbose=False, board_pool=pool) for _ in range(2)]
+    for i, gm in enumerate(games):
+        # fast steps put the clicks in the middle of frames, slow ones right after the turn
+        recorder = record_game(gm, 1 / 60 if i % 2 else 0.5, 25, i)
+        path = tmp_path / f'session-{gm.seed}.json'
+        recorder.save(path)
+        session = load_session(path)
+        assert session['final_score']['total_score'] > 0
+        assert verify_session(session)
+        assert replay_session(session).get_color_cells() == gm.get_color_cells()
+        # a session that ends on another score does not verify
+        session['final_score']['total_score'] += 1
+        assert not verify_session(session)
+
+def test_replay_scores_match():
+    gm = GameManager(verbose=False, seed=9, dimension_x=6, dimension_y=10)
+    session = record_game(gm, 0.1, 15, 9).get_session()
+    assert score_info_to_dict(replay_session(session).get_score_info()) == score_info_to_dict(gm.get_score_info())
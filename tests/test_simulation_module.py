@@ -0,0 +1,15 @@
+from game_manager import GameManager
+from simulation_module import HeadlessGame, run_random_games
+
+def test_rejected_turn_does_not_affect_the_next():
+    for first, second in (((-1, 0), (0, 0)), ((0, 0), (8, 0)), ((0, 0), (0, 5)), ((3, 3), (3, 3))):
+        game = HeadlessGame(GameManager(verbose=False, seed=4))
+        gm = game.game_manager
+        move = gm.get_valid_moves()[0]
+        assert not game.play_turn(first, second)
+        assert gm.selected_sprite_1 is None and gm.selected_sprite_2 is None
+        assert game.play_turn(*move)
+
+def test_random_games_are_seeded():
+    scores = [[score.total_score for score in run_random_games(3, 10, seed=5)] for _ in range(2)]
+    assert scores[0] == scores[1]
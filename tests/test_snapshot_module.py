@@ -0,0 +1,56 @@
+import pytest
+from game_manager import GameManager
+from game_object import GameStatus
+from replay_module import score_info_to_dict
+from simulation_module import HeadlessGame
+from snapshot_module import dump_snapshot, header_struct, load_snapshot, restore_snapshot
+
+# byte offset of the status code in the header: magic, version, dimension_x, dimension_y, color count
+status_offset = 4 + 1 + 2 + 2 + 1
+
+def play_game(seed: int, turn_count: int) -> GameManager:
+    game = HeadlessGame(GameManager(verbose=False, seed=seed), seed=seed)
+    for _ in range(turn_count):
+        game.play_random_turn()
+    return game.game_manager
+
+def test_restore_round_trip():
+    for seed in range(5):
+        gm = play_game(seed, 10)
+        data = dump_snapshot(gm)
+        target = play_game(seed + 100, 3)
+        restore_snapshot(target, data)
+        assert target.get_color_cells() == gm.get_color_cells()
+        assert score_info_to_dict(target.get_score_info()) == score_info_to_dict(gm.get_score_info())
+        assert target.score_sprite.score_info is target.get_score_info()
+        assert target.game_status == gm.game_status
+        assert dump_snapshot(target) == data
+
+def test_moving_status_is_rejected():
+    gm = play_game(1, 2)
+    data = bytearray(dump_snapshot(gm))
+    data[status_offset] = GameStatus.SwapingForward.value[0]
+    with pytest.raises(Exception, match='resting'):
+        load_snapshot(data)
+    target = play_game(2, 2)
+    cells = target.get_color_cells()
+    with pytest.raises(Exception, match='resting'):
+        restore_snapshot(target, data)
+    assert target.game_status == GameStatus.Idle
+    assert target.get_color_cells() == cells
+
+def test_bad_cells_leave_game_unchanged():
+    gm = play_game(1, 2)
+    target = play_game(2, 2)
+    cells = target.get_color_cells()
+    score = score_info_to_dict(target.get_score_info())
+    data = bytearray(dump_snapshot(gm))
+    data[-1] = len(GameManager.color_keys) + 3
+    with pytest.raises(Exception, match='out of range'):
+        restore_snapshot(target, data)
+    smaller = dump_snapshot(GameManager(verbose=False, seed=3, dimension_x=6, dimension_y=6))
+    with pytest.raises(Exception, match='board size'):
+        restore_snapshot(target, smaller)
+    assert target.get_color_cells() == cells
+    assert score_info_to_dict(target.get_score_info()) == score
+    assert len(data) == header_struct.size + 8 * 8
@@ -0,0 +1,25 @@
+import random
+from generator_module import BoardGenerator
+from solver_module import MoveSolver
+
+def test_scores_do_not_depend_on_workers():
+    cells = BoardGenerator(8, 8, 6).generate(random.Random(2))
+    scores = {}
+    for strategy in ('greedy', 'montecarlo'):
+        for workers in (1, 3, 4):
+            solver = MoveSolver(8, 8, 6, strategy, rollouts=7, depth=2, workers=workers, seed=11)
+            try:
+                scores[strategy, workers] = [solver.evaluate_moves(cells) for _ in range(2)]
+            finally:
+                solver.shutdown()
+        assert scores[strategy, 1] == scores[strategy, 3] == scores[strategy, 4]
+        # the next call draws new rollouts
+        assert scores[strategy, 1][0] != scores[strategy, 1][1]
+
+def test_choose_move_is_valid():
+    cells = BoardGenerator(6, 6, 6).generate(random.Random(5))
+    solver = MoveSolver(6, 6, 6, 'expectimax', rollouts=2, depth=2, workers=1, seed=3)
+    move = solver.choose_move(cells)
+    assert move in solver.move_finder.get_valid_moves(cells)
+    assert solver.submit_choose_move(cells).result() in solver.move_finder.get_valid_moves(cells)
+    solver.shutdown()